@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark gdm.py provisioning against the stub Eneo API.
+
+For every combination of model count, tenant user count and simulated
+latency, a fresh stub is started and gdm.py's main() runs in a child
+process twice: a cold run against an empty Eneo and state directory, and
+a warm run that should be skipped by the applied-configuration
+fingerprint. Wall time, request count and bytes transferred are reported
+per run (median over --repeat rounds).
+
+    python3 bench/gdm_bench.py --models 3,30,100 --users 1,1000 --latency-ms 0,25
+    python3 bench/gdm_bench.py --engine asyncio --output bench-results.json
+
+Requires the packages gdm.py imports (requests, urllib3).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FILES_DIR = os.path.join(BENCH_DIR, os.pardir, "charts", "eneo", "files")
+
+sys.path.insert(0, BENCH_DIR)
+from stub_eneo import StubEneo  # noqa: E402
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def _float_list(value):
+    return [float(v) for v in value.split(",") if v]
+
+
+def run_worker(model_count):
+    """Child process: load gdm.py, widen its model catalog and time main()."""
+    sys.path.insert(0, FILES_DIR)
+    import gdm
+
+    template = gdm.completion_models[0]
+    extra = [
+        {**template, "name": f"bench-model-{i}", "display_name": f"bench-model-{i}"}
+        for i in range(max(model_count - len(gdm.completion_models), 0))
+    ]
+    gdm.completion_models[:] = (gdm.completion_models + extra)[:model_count]
+
+    started = time.perf_counter()
+    status = 0
+    try:
+        gdm.main()
+    except SystemExit as e:
+        status = e.code or 0
+    except Exception as e:
+        print(f"main() failed: {type(e).__name__}: {e}")
+        status = 1
+    print("BENCH " + json.dumps({"seconds": time.perf_counter() - started, "status": status}))
+
+
+def _run_once(stub, model_count, state_dir, config_path, args, log):
+    env = {
+        **os.environ,
+        "ENEO_URL": stub.url,
+        "ENEO_SUPER_API_KEY": "bench",
+        "GDM_CONFIG_PATH": config_path,
+        "GDM_MODEL_CATALOG": os.path.join(FILES_DIR, "model_catalog.json"),
+        "GDM_STATE_DIR": state_dir,
+        "GDM_ENGINE": args.engine,
+        "GDM_ALL_TENANTS": str(args.tenants > 1).lower(),
+        "GDM_WATCH": "false",
+        "GDM_JSON_LOGS": "false",
+        "GDM_HEALTH_DEADLINE": "30",
+        "PYTHONUNBUFFERED": "1",
+    }
+    stub.reset_counters()
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", str(model_count)],
+        env=env, capture_output=True, text=True,
+    )
+    process_seconds = time.perf_counter() - started
+    log.write(proc.stdout + proc.stderr)
+
+    result = {"seconds": None, "status": proc.returncode}
+    for line in proc.stdout.splitlines():
+        if line.startswith("BENCH "):
+            result = json.loads(line[len("BENCH "):])
+    return {**result, "process_seconds": process_seconds, **stub.counters}
+
+
+def run_scenario(args, model_count, users, latency_ms, log):
+    """Return the median cold and warm run metrics for one scenario."""
+    runs = {"cold": [], "warm": []}
+    for _ in range(args.repeat):
+        stub = StubEneo(users=users, tenants=args.tenants, latency_ms=latency_ms, jitter_ms=args.jitter_ms,
+                        error_rate=args.error_rate, error_status=args.error_status,
+                        seed=args.seed).start()
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                config_path = os.path.join(workdir, "gdm.json")
+                with open(config_path, "w") as f:
+                    json.dump({"enabled": True, "apiKey": "bench-key", "mcpEnabled": True}, f)
+                for phase in ("cold", "warm"):
+                    log.write(f"\n=== models={model_count} users={users} latency={latency_ms}ms {phase} ===\n")
+                    runs[phase].append(_run_once(stub, model_count, workdir, config_path, args, log))
+        finally:
+            stub.stop()
+
+    summary = {"models": model_count, "users": users, "latency_ms": latency_ms}
+    for phase, results in runs.items():
+        ok = [r for r in results if r["status"] == 0 and r["seconds"] is not None]
+        pick = ok or results
+        summary[phase] = {
+            "ok": len(ok) == len(results),
+            "seconds": statistics.median(r["seconds"] or 0.0 for r in pick),
+            "process_seconds": statistics.median(r["process_seconds"] for r in pick),
+            "requests": statistics.median(r["requests"] for r in pick),
+            "errors": statistics.median(r["errors"] for r in pick),
+            "bytes_in": statistics.median(r["bytes_in"] for r in pick),
+            "bytes_out": statistics.median(r["bytes_out"] for r in pick),
+        }
+    return summary
+
+
+def print_table(results):
+    header = (f"{'models':>6} {'users':>6} {'lat ms':>6} | {'cold s':>7} {'reqs':>5} {'KB in':>7} {'KB out':>7}"
+              f" | {'warm s':>7} {'reqs':>5} {'KB in':>7} {'KB out':>7}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        cells = [f"{r['models']:>6} {r['users']:>6} {r['latency_ms']:>6g}"]
+        for phase in ("cold", "warm"):
+            p = r[phase]
+            flag = "" if p["ok"] else "!"
+            cells.append(f"{p['seconds']:>6.2f}{flag or ' '} {p['requests']:>5g}"
+                         f" {p['bytes_in'] / 1024:>7.1f} {p['bytes_out'] / 1024:>7.1f}")
+        print(" | ".join(cells))
+    if any(not r[phase]["ok"] for r in results for phase in ("cold", "warm")):
+        print("! = at least one run failed, see the log")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gdm.py provisioning against a stub Eneo API.")
+    parser.add_argument("--models", type=_int_list, default=[3, 30, 100],
+                        help="completion model counts (comma separated)")
+    parser.add_argument("--users", type=_int_list, default=[1, 1000],
+                        help="user counts per tenant (comma separated)")
+    parser.add_argument("--tenants", type=int, default=1,
+                        help="tenants in the stub; more than one runs gdm.py with GDM_ALL_TENANTS")
+    parser.add_argument("--latency-ms", type=_float_list, default=[0.0, 25.0],
+                        help="simulated per-request latency (comma separated)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of API requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--engine", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log", default=os.path.join(tempfile.gettempdir(), "gdm-bench.log"),
+                        help="where gdm.py output is written")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker)
+        return
+
+    results = []
+    with open(args.log, "w") as log:
+        for model_count in args.models:
+            for users in args.users:
+                for latency_ms in args.latency_ms:
+                    results.append(run_scenario(args, model_count, users, latency_ms, log))
+    print_table(results)
+    print(f"gdm.py output: {args.log}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"engine": args.engine, "tenants": args.tenants, "repeat": args.repeat, "error_rate": args.error_rate,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
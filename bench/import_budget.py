@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Measure the import time of every chart bootstrap script against a budget.
+
+The bootstrap scripts run as init containers and sidecars, so what they
+import before doing any work sits on the pod-start path. For each script
+under charts/*/files, the module-level imports (not the script body, which
+talks to services) are run in a fresh interpreter with -X importtime, and
+the total is compared to the script's entry in import_budget.json
+(milliseconds, median over --repeat runs). Imports done inside functions
+are deferred and therefore not counted.
+
+    python3 bench/import_budget.py                 # report, exit 1 on a regression
+    python3 bench/import_budget.py --top 8         # show the 8 heaviest imports per script
+    python3 bench/import_budget.py --write-budget  # record current times (+ headroom) as the budget
+
+Modules that are not installed locally are reported and left out of the
+total; run it in an environment that has the charts' packages for exact
+numbers.
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.normpath(os.path.join(BENCH_DIR, os.pardir))
+BUDGET_PATH = os.path.join(BENCH_DIR, "import_budget.json")
+MARKER = "--- script imports ---"
+
+
+def module_imports(path):
+    """Source of the import statements a script runs at module level."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    statements = []
+
+    def visit(body):
+        for node in body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                statements.append(ast.unparse(node))
+            elif isinstance(node, ast.If):
+                visit(node.body)
+                visit(node.orelse)
+            elif isinstance(node, ast.Try):
+                visit(node.body)
+                for handler in node.handlers:
+                    visit(handler.body)
+
+    visit(tree.body)
+    return statements
+
+
+def _snippet(statements):
+    """Code running each import, collecting the ones that are not installed."""
+    lines = ["import sys", "missing = []", f"sys.stderr.write({MARKER!r} + '\\n')"]
+    for statement in statements:
+        lines += ["try:", f"    {statement}", "except ImportError as e:", "    missing.append(e.name or str(e))"]
+    lines.append("print(','.join(sorted(set(missing))))")
+    return "\n".join(lines)
+
+
+def parse_importtime(stderr):
+    """{top-level module: cumulative microseconds} from -X importtime output after the marker."""
+    seen_marker = False
+    totals = {}
+    for line in stderr.splitlines():
+        if line == MARKER:
+            seen_marker = True
+            continue
+        if not seen_marker or not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        if name.startswith("  "):
+            continue  # nested import, already part of its parent's cumulative time
+        totals[name.strip()] = totals.get(name.strip(), 0) + int(cumulative)
+    return totals
+
+
+def measure(path, repeat):
+    """Median total import time (ms), per-module medians (ms) and missing modules of one script."""
+    statements = module_imports(path)
+    code = _snippet(statements)
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(path), "PYTHONDONTWRITEBYTECODE": "1"}
+    runs = []
+    missing = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                              capture_output=True, text=True, cwd=os.path.dirname(path))
+        missing = [m for m in proc.stdout.strip().split(",") if m]
+        runs.append(parse_importtime(proc.stderr))
+
+    modules = {name for run in runs for name in run}
+    per_module = {name: statistics.median(run.get(name, 0) for run in runs) / 1000 for name in modules}
+    total = statistics.median(sum(run.values()) for run in runs) / 1000
+    return total, per_module, missing
+
+
+def load_budget():
+    try:
+        with open(BUDGET_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget for the chart bootstrap scripts.")
+    parser.add_argument("scripts", nargs="*",
+                        help="scripts to measure (default: charts/*/files/*.py)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="heaviest imports listed per script")
+    parser.add_argument("--write-budget", action="store_true",
+                        help="store the measured times plus --headroom as the new budget")
+    parser.add_argument("--headroom", type=float, default=1.5)
+    parser.add_argument("--min-budget", type=float, default=5.0,
+                        help="smallest budget written, below this the noise dominates (ms)")
+    args = parser.parse_args()
+
+    scripts = args.scripts or sorted(glob.glob(os.path.join(REPO_DIR, "charts", "*", "files", "*.py")))
+    budget = load_budget()
+    measured = {}
+    over = []
+
+    print(f"{'script':<36} {'ms':>7} {'budget':>7}  heaviest imports")
+    for path in scripts:
+        key = os.path.relpath(os.path.abspath(path), os.path.join(REPO_DIR, "charts"))
+        total, per_module, missing = measure(path, args.repeat)
+        measured[key] = total
+        limit = budget.get(key)
+        flag = ""
+        if limit is not None and total > limit:
+            flag = "  OVER BUDGET"
+            over.append(key)
+        heaviest = sorted(per_module.items(), key=lambda item: -item[1])[:args.top]
+        top = ", ".join(f"{name} {ms:.1f}" for name, ms in heaviest)
+        limit_text = f"{limit:>7g}" if limit is not None else f"{'-':>7}"
+        print(f"{key:<36} {total:>7.1f} {limit_text}  {top}{flag}")
+        if missing:
+            print(f"{'':<36} {'':>7} {'':>7}  not installed: {', '.join(missing)}")
+
+    if args.write_budget:
+        budget.update({key: round(max(ms * args.headroom, args.min_budget)) for key, ms in measured.items()})
+        with open(BUDGET_PATH, "w") as f:
+            json.dump(dict(sorted(budget.items())), f, indent=2)
+            f.write("\n")
+        print(f"Wrote {os.path.relpath(BUDGET_PATH)}")
+    elif over:
+        print(f"Import time over budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
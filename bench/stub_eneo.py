@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the Eneo API endpoints used by gdm.py.
+
+Serves healthz, sysadmin users/tenants/access-token, model-providers,
+ai-models, tenant-models/<kind> and mcp-servers with the same shapes as
+Eneo, plus a minimal MCP gateway (initialize, tools/list) at /api/v1/mcp
+for GDM_PORTAL_URL to point at. Tenant-scoped data is kept per tenant, resolved from the bearer
+token. Every response can be delayed (latency + jitter), a fraction of
+requests can be failed with an injected status and whole tenants can be
+made to fail, so provisioning can be measured under realistic network
+conditions. Request count and bytes in both directions are tallied per
+stub instance.
+
+Run standalone for manual testing:
+
+    python3 bench/stub_eneo.py --port 8000 --tenants 3 --users 500 --latency-ms 20
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MODEL_KINDS = ("completion", "embedding", "transcription")
+
+
+class _CountingFile:
+    """Wrap a socket file and add the bytes moved through it to a counter."""
+
+    def __init__(self, raw, stub, field):
+        self._raw = raw
+        self._stub = stub
+        self._field = field
+
+    def _count(self, n):
+        with self._stub.lock:
+            self._stub.counters[self._field] += n
+
+    def read(self, *args):
+        data = self._raw.read(*args)
+        self._count(len(data))
+        return data
+
+    def readline(self, *args):
+        data = self._raw.readline(*args)
+        self._count(len(data))
+        return data
+
+    def write(self, data):
+        self._count(len(data))
+        return self._raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class StubEneo:
+    """A threaded stub Eneo server with latency and error injection."""
+
+    def __init__(self, users=1, tenants=1, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 error_status=503, broken_tenants=0, tools=20, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tenants = {}
+        self.users = []
+        for index in range(tenants):
+            tenant_id = str(uuid.uuid4())
+            self.tenants[tenant_id] = {
+                "name": f"bench-{index}",
+                "broken": index < broken_tenants,
+                "providers": [],
+                "models": {kind: [] for kind in MODEL_KINDS},
+                "mcp_servers": [],
+            }
+            self.users.extend(
+                {"id": str(uuid.uuid4()), "tenant_id": tenant_id,
+                 "roles": [{"id": f"role-user-{index}", "name": "User"}]}
+                for _ in range(max(users - 1, 0))
+            )
+        # Owners come last so tenant discovery pays for the whole user list
+        for index, tenant_id in enumerate(self.tenants):
+            self.users.append({"id": str(uuid.uuid4()), "tenant_id": tenant_id,
+                               "roles": [{"id": f"role-owner-{index}", "name": "Owner",
+                                          "predefined_source": "Owner"}]})
+        self.tokens = {}  # access token -> tenant id
+        self.tools = [
+            {"name": f"tool_{i}", "description": f"Bench tool {i}",
+             "inputSchema": {"type": "object", "properties": {"q": {"type": "string"}}}}
+            for i in range(tools)
+        ]
+        self.counters = {}
+        self.reset_counters()
+        self._server = None
+
+    def reset_counters(self):
+        with self.lock:
+            self.counters = {"requests": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0, "gateway_requests": 0,
+                             "tool_syncs": 0}
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve from a daemon thread; port 0 picks a free port (see .url)."""
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = max(self.latency_ms + jitter, 0.0) / 1000
+        if delay:
+            time.sleep(delay)
+
+    def _inject_error(self):
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    # -- routing -------------------------------------------------------------
+
+    def _tenant_for(self, authorization):
+        """The tenant whose access token is in the Authorization header."""
+        token = (authorization or "").replace("Bearer ", "", 1)
+        return self.tenants.get(self.tokens.get(token))
+
+    def handle(self, method, raw_path, body, authorization=None):
+        """Return (status, payload) for one request."""
+        parts = urlsplit(raw_path)
+        path = parts.path
+        query = parse_qs(parts.query)
+        segments = path.strip("/").split("/")
+
+        if path == "/api/healthz":
+            return 200, {"status": "OK"}
+        if path == "/api/v1/mcp" and method == "POST":
+            return self._gateway(body)
+
+        self._delay()
+        with self.lock:
+            self.counters["requests"] += 1
+        if self._inject_error():
+            with self.lock:
+                self.counters["errors"] += 1
+            return self.error_status, {"detail": "Injected error"}
+
+        with self.lock:
+            if path.startswith("/api/v1/sysadmin/"):
+                return self._sysadmin(method, path, query, segments, body)
+            tenant = self._tenant_for(authorization)
+            if tenant is None:
+                return 401, {"detail": "Invalid token"}
+            if tenant["broken"]:
+                return 500, {"detail": "Injected tenant failure"}
+            if path.startswith("/api/v1/admin/model-providers/"):
+                return self._providers(tenant, method, segments, body)
+            if path == "/api/v1/ai-models/" and method == "GET":
+                return 200, {f"{kind}_models": models for kind, models in tenant["models"].items()}
+            if path.startswith("/api/v1/admin/tenant-models/"):
+                return self._tenant_models(tenant, method, segments, body)
+            if path.startswith("/api/v1/mcp-servers/"):
+                return self._mcp(tenant, method, path, segments, body)
+        return 404, {"detail": f"Not found: {method} {path}"}
+
+    def _gateway(self, message):
+        """Answer one MCP JSON-RPC message; tools/list pages through self.tools."""
+        with self.lock:
+            self.counters["gateway_requests"] += 1
+        method = message.get("method")
+        if "id" not in message:
+            return 202, None
+        if method == "initialize":
+            result = {"protocolVersion": "2025-03-26", "capabilities": {"tools": {}},
+                      "serverInfo": {"name": "stub-gateway", "version": "1"}}
+            return 200, {"jsonrpc": "2.0", "id": message["id"], "result": result}, {"Mcp-Session-Id": uuid.uuid4().hex}
+        if method == "tools/list":
+            start = int((message.get("params") or {}).get("cursor") or 0)
+            with self.lock:
+                page = self.tools[start:start + 10]
+                result = {"tools": page}
+                if start + 10 < len(self.tools):
+                    result["nextCursor"] = str(start + 10)
+            return 200, {"jsonrpc": "2.0", "id": message["id"], "result": result}
+        return 200, {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32601, "message": "Method not found"}}
+
+    def _sysadmin(self, method, path, query, segments, body):
+        if path == "/api/v1/sysadmin/tenants/" and method == "GET":
+            return 200, {"items": [{"id": tenant_id, "name": tenant["name"]}
+                                   for tenant_id, tenant in self.tenants.items()]}
+        if path == "/api/v1/sysadmin/users/" and method == "GET":
+            limit = int(query.get("limit", [len(self.users)])[0])
+            offset = int(query.get("offset", [0])[0])
+            return 200, {"items": self.users[offset:offset + limit], "total_count": len(self.users)}
+        if path == "/api/v1/sysadmin/users/" and method == "POST":
+            user = {"id": str(uuid.uuid4()), **body}
+            self.users.append(user)
+            return 200, user
+        if len(segments) == 6 and segments[5] == "access-token" and method == "POST":
+            user = next((u for u in self.users if u["id"] == segments[4]), None)
+            if user is None:
+                return 404, {"detail": "Not found"}
+            token = f"token-{uuid.uuid4().hex}"
+            self.tokens[token] = user["tenant_id"]
+            return 200, token
+        if len(segments) == 5 and method == "DELETE":
+            self.users = [u for u in self.users if u["id"] != segments[4]]
+            return 200, {}
+        return 404, {"detail": "Not found"}
+
+    def _providers(self, tenant, method, segments, body):
+        if len(segments) == 4:
+            if method == "GET":
+                return 200, tenant["providers"]
+            if method == "POST":
+                provider = {"id": str(uuid.uuid4()), **body, "credentials": {"api_key": "***"}}
+                tenant["providers"].append(provider)
+                return 200, provider
+        elif method == "PUT":
+            for provider in tenant["providers"]:
+                if provider["id"] == segments[4]:
+                    provider.update(body, credentials={"api_key": "***"})
+                    return 200, provider
+        return 404, {"detail": "Not found"}
+
+    def _tenant_models(self, tenant, method, segments, body):
+        kind = segments[4] if len(segments) > 4 else ""
+        if kind not in tenant["models"]:
+            return 404, {"detail": "Not found"}
+        if len(segments) == 5 and method == "POST":
+            model = {"id": str(uuid.uuid4()), **body}
+            tenant["models"][kind].append(model)
+            return 200, model
+        if len(segments) == 6 and method == "PUT":
+            for model in tenant["models"][kind]:
+                if model["id"] == segments[5]:
+                    model.update(body)
+                    return 200, model
+        return 404, {"detail": "Not found"}
+
+    def _mcp(self, tenant, method, path, segments, body):
+        if path == "/api/v1/mcp-servers/":
+            if method == "GET":
+                return 200, {"items": tenant["mcp_servers"]}
+            server = {"id": str(uuid.uuid4()), **body}
+            tenant["mcp_servers"].append(server)
+            return 200, {"server": server, "connection": {"success": True, "tools_discovered": len(self.tools)}}
+        if segments[3] == "settings":
+            return 200, {}
+        if path.endswith("/tools/sync/"):
+            self.counters["tool_syncs"] += 1
+            return 200, {"connection": {"success": True}, "new_tools": [], "changed_tools": [],
+                         "unchanged_count": len(self.tools), "has_pending_changes": False}
+        if path.endswith("/approve-all/"):
+            return 200, {}
+        for server in tenant["mcp_servers"]:
+            if server["id"] == segments[3]:
+                server.update(body)
+                return 200, server
+        return 404, {"detail": "Not found"}
+
+
+def _make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without TCP_NODELAY every
+        # keep-alive response would stall on the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            self.rfile = _CountingFile(self.rfile, stub, "bytes_in")
+            self.wfile = _CountingFile(self.wfile, stub, "bytes_out")
+
+        def _dispatch(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                body = {}
+            status, payload, *extra = stub.handle(self.command, self.path, body, self.headers.get("Authorization"))
+            data = json.dumps(payload).encode() if payload is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (extra[0] if extra else {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--users", type=int, default=1, help="users per tenant")
+    parser.add_argument("--tenants", type=int, default=1)
+    parser.add_argument("--broken-tenants", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    stub = StubEneo(users=args.users, tenants=args.tenants, latency_ms=args.latency_ms,
+                    jitter_ms=args.jitter_ms, error_rate=args.error_rate, error_status=args.error_status,
+                    broken_tenants=args.broken_tenants).start(args.host, args.port)
+    print(f"Stub Eneo listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
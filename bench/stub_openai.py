@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for an OpenAI-compatible inference endpoint.
+
+Serves GET /models and POST /chat/completions (streamed as server-sent
+events or as one JSON body) under --prefix, for testing the n8n
+inference warm-up (charts/n8n/files/warmup.py) without GDM. Requests need
+"Authorization: Bearer <--api-key>"; unknown models answer 404 like
+OpenAI. The first completion of each model waits --cold-ms on top of
+--ttft-ms before its first token, to look like a model being loaded.
+
+Run standalone for manual testing:
+
+    python3 bench/stub_openai.py --port 8100 --models gpt-oss-120b,llama-3.3 --ttft-ms 80 --cold-ms 2000
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class StubOpenAI:
+    """A threaded stub OpenAI-compatible server with first-token and cold-start delays."""
+
+    def __init__(self, models=("stub-model",), api_key="stub-key", prefix="/api/v1", ttft_ms=0.0,
+                 cold_ms=0.0, token_ms=0.0, tokens=3):
+        self.models = list(models)
+        self.api_key = api_key
+        self.prefix = prefix.rstrip("/")
+        self.ttft_ms = ttft_ms
+        self.cold_ms = cold_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.lock = threading.Lock()
+        self.warm = set()
+        self.counters = {"requests": 0, "completions": 0, "unauthorized": 0}
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.prefix}"
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve from a daemon thread; port 0 picks a free port (see .url)."""
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def first_token_delay(self, model):
+        """Seconds before the first token; the first request per model also pays --cold-ms."""
+        with self.lock:
+            cold = model not in self.warm
+            self.warm.add(model)
+        return (self.ttft_ms + (self.cold_ms if cold else 0.0)) / 1000
+
+    def authorized(self, authorization):
+        ok = authorization == f"Bearer {self.api_key}"
+        with self.lock:
+            self.counters["requests"] += 1
+            if not ok:
+                self.counters["unauthorized"] += 1
+        return ok
+
+
+def _error(message, code):
+    return {"error": {"message": message, "type": "invalid_request_error", "code": code}}
+
+
+def _make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _dispatch(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            path = urlsplit(self.path).path
+            if not path.startswith(stub.prefix + "/"):
+                return self._json(404, _error(f"Unknown path {path}", "not_found"))
+            path = path[len(stub.prefix):]
+            if not stub.authorized(self.headers.get("Authorization")):
+                return self._json(401, _error("Incorrect API key provided", "invalid_api_key"))
+
+            if self.command == "GET" and path == "/models":
+                return self._json(200, {"object": "list", "data": [
+                    {"id": model, "object": "model", "owned_by": "stub"} for model in stub.models]})
+            if self.command == "POST" and path == "/chat/completions":
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    return self._json(400, _error("Invalid JSON body", "invalid_json"))
+                return self._complete(body)
+            return self._json(404, _error(f"Unknown endpoint {self.command} {path}", "not_found"))
+
+        def _complete(self, body):
+            model = body.get("model")
+            if model not in stub.models:
+                return self._json(404, _error(f"The model `{model}` does not exist", "model_not_found"))
+            with stub.lock:
+                stub.counters["completions"] += 1
+            tokens = min(stub.tokens, int(body.get("max_tokens") or stub.tokens))
+            time.sleep(stub.first_token_delay(model))
+
+            if not body.get("stream"):
+                time.sleep(stub.token_ms * max(tokens - 1, 0) / 1000)
+                return self._json(200, {"object": "chat.completion", "model": model, "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": "pong"[:tokens]},
+                     "finish_reason": "length"}]})
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for index in range(tokens):
+                if index:
+                    time.sleep(stub.token_ms / 1000)
+                chunk = {"object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": "pong"[index:index + 1]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+        do_GET = do_POST = _dispatch
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--models", default="stub-model", help="comma separated model ids")
+    parser.add_argument("--api-key", default="stub-key")
+    parser.add_argument("--prefix", default="/api/v1")
+    parser.add_argument("--ttft-ms", type=float, default=0.0)
+    parser.add_argument("--cold-ms", type=float, default=0.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubOpenAI(models=args.models.split(","), api_key=args.api_key, prefix=args.prefix,
+                      ttft_ms=args.ttft_ms, cold_ms=args.cold_ms, token_ms=args.token_ms).start(args.host, args.port)
+    print(f"Stub OpenAI endpoint listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
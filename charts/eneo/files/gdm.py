@@ -1,154 +1,450 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import contextvars
+import functools
+import hashlib
+import importlib.util
 import json
+import sys
+import threading
 import time
+import urllib.parse
 import uuid
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import os
-import urllib3
 
-urllib3.disable_warnings()
+import readiness
+import resilience
+import telemetry
+
+def _lazy_import(name):
+    """Import a module on first attribute access, so startup and the health wait do not pay for it."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+requests = _lazy_import("requests")
 
 url = os.getenv("ENEO_URL", "http://localhost:8000")
 super_api_key = os.getenv("ENEO_SUPER_API_KEY", "")
 
-gdm_config = {}
-with open("/app/gdm.json", "r") as f:
-    gdm_config = json.loads(f.read())
+# Connection pool and timeouts for the shared HTTP session
+http_pool_size = int(os.getenv("GDM_HTTP_POOL_SIZE", "10"))
+http_connect_timeout = float(os.getenv("GDM_HTTP_CONNECT_TIMEOUT", "5"))
+http_read_timeout = float(os.getenv("GDM_HTTP_READ_TIMEOUT", "60"))
 
-is_test = os.getenv("TESTCLUSTER", "").lower() == "true"
-portal_base = "https://aidev.gdm.se" if is_test else "https://ai.gdm.se"
-
-provider_config = {
-    "name": "GDM",
-    "provider_type": "openai",
-    "config": {
-        "endpoint": f"{portal_base}/api/v1"
-    },
-    "credentials": {
-        "api_key": gdm_config.get("apiKey", "")
-    },
-    "is_active": gdm_config.get("enabled", False)
-}
+# Retries of transient API failures (idempotent calls, and creates once rechecked)
+http_retries = int(os.getenv("GDM_HTTP_RETRIES", "3"))
+http_backoff = float(os.getenv("GDM_HTTP_BACKOFF", "0.5"))
+http_backoff_max = float(os.getenv("GDM_HTTP_BACKOFF_MAX", "8"))
+
+# Budget for all API calls of one provisioning pass (seconds, 0 = unbounded)
+run_deadline_seconds = float(os.getenv("GDM_RUN_DEADLINE", "900"))
+
+# Stop calling Eneo after this many consecutive unavailable answers, for this long
+breaker_threshold = int(os.getenv("GDM_BREAKER_THRESHOLD", "5"))
+breaker_reset_seconds = float(os.getenv("GDM_BREAKER_RESET_SECONDS", "30"))
+
+# Overall budget for waiting on /api/healthz (seconds, 0 waits forever)
+health_deadline = float(os.getenv("GDM_HEALTH_DEADLINE", "0"))
+
+# Where run state (e.g. digests of applied credentials) is persisted
+state_dir = os.getenv("GDM_STATE_DIR", "/app/data")
+state_path = os.path.join(state_dir, "gdm-state.json")
 
-mcp_server_config = {
-    "name": "GDM MCP Gateway",
-    "http_url": f"{portal_base}/api/v1/mcp",
-    "http_auth_type": "bearer",
-    "http_auth_config_schema": {
-        "token": gdm_config.get("apiKey", "")
-    },
-    "description": "GDM AI MCP Gateway",
-    "documentation_url": f"{portal_base}/api-docs",
+# A recorded fingerprint is trusted for at most this long (seconds)
+fingerprint_max_age = int(os.getenv("GDM_FINGERPRINT_MAX_AGE", "86400"))
+force_provision = os.getenv("GDM_FORCE_PROVISION", "").lower() == "true"
+
+# Page size when scanning sysadmin users for the tenant and Owner role
+users_page_size = int(os.getenv("GDM_USERS_PAGE_SIZE", "100"))
+
+# Model reconciliation concurrency; kinds listed here are upserted in order
+reconcile_workers = int(os.getenv("GDM_RECONCILE_WORKERS", "4"))
+reconcile_serial_kinds = {
+    kind.strip() for kind in os.getenv("GDM_RECONCILE_SERIAL_KINDS", "").split(",") if kind.strip()
 }
 
-completion_models = [
-    {
-        "name": "gemma3-27b-it",
-        "display_name": "gemma3-27b-it",
-        "token_limit": 128000,
-        "max_input_tokens": 128000,
-        "max_output_tokens": 4096,
-        "vision": True,
-        "reasoning": False,
-        "hosting": "swe",
-        "is_active": True,
-    },
-    {
-        "name": "gemma4-31b-it",
-        "display_name": "gemma4-31b-it",
-        "token_limit": 256000,
-        "max_input_tokens": 256000,
-        "max_output_tokens": 65536,
-        "vision": True,
-        "reasoning": True,
-        "hosting": "swe",
-        "is_active": True,
-    },
-    {
-        "name": "gpt-oss-120b",
-        "display_name": "gpt-oss-120b",
-        "token_limit": 128000,
-        "max_input_tokens": 128000,
-        "max_output_tokens": 4096,
-        "vision": False,
-        "reasoning": True,
-        "hosting": "swe",
-        "is_active": True,
-    },
-]
-
-embedding_models = [
-    {
-        "name": "multilingual-e5-large-instruct",
-        "display_name": "multilingual-e5-large-instruct",
-        "family": "e5",
-        "max_input": 512,
-        "hosting": "swe",
-        "is_active": True,
-    },
-]
-
-transcription_models = [
-    {
-        "name": "kb-whisper-large",
-        "display_name": "kb-whisper-large",
-        "hosting": "swe",
-        "is_active": True,
-    },
-]
+# Multi-tenant mode: provision every tenant, not just the first Owner's
+all_tenants = os.getenv("GDM_ALL_TENANTS", "").lower() == "true"
+tenant_workers = int(os.getenv("GDM_TENANT_WORKERS", "4"))
+tenant_rate_limit = float(os.getenv("GDM_TENANT_RATE_LIMIT", "0"))  # requests/s per tenant, 0 = unlimited
 
-def wait_for_health():
-    """Wait for the API healthz endpoint to return 200"""
-    health_url = f"{url.rstrip('/')}/api/healthz"
-    print(f"Waiting for {health_url} to be ready...")
+# Provisioning engine: "threads" (default) or "asyncio"; the asyncio engine keeps at
+# most GDM_ASYNC_CONCURRENCY API calls in flight and bounds each step by its deadline
+provision_engine = os.getenv("GDM_ENGINE", "threads")
+async_concurrency = int(os.getenv("GDM_ASYNC_CONCURRENCY", "4"))
+step_deadline = float(os.getenv("GDM_STEP_DEADLINE", "120"))
+mcp_sync_deadline = float(os.getenv("GDM_MCP_SYNC_DEADLINE", "300"))
 
-    while True:
+# MCP tool sync runs in the background every GDM_MCP_SYNC_INTERVAL seconds (0 disables)
+# and only asks Eneo to rediscover tools when the gateway's tool manifest changed
+mcp_sync_interval = float(os.getenv("GDM_MCP_SYNC_INTERVAL", "3600"))
+mcp_sync_inline = os.getenv("GDM_MCP_SYNC_INLINE", "").lower() == "true"
+
+# Mounted gdm.json; mount it as a directory (not subPath) for watch mode to see updates
+config_path = os.getenv("GDM_CONFIG_PATH", "/app/gdm.json")
+
+# Compiled model catalog shared with generate_models.py
+model_catalog_path = os.getenv("GDM_MODEL_CATALOG", "/app/model_catalog.json")
+
+# Watch mode: keep running and apply gdm.json changes in place
+watch_enabled = os.getenv("GDM_WATCH", "").lower() == "true"
+watch_poll_seconds = float(os.getenv("GDM_WATCH_POLL_SECONDS", "5"))
+watch_debounce_seconds = float(os.getenv("GDM_WATCH_DEBOUNCE_SECONDS", "2"))
+drift_check_seconds = float(os.getenv("GDM_DRIFT_CHECK_SECONDS", "3600"))
+watch_retry_seconds = float(os.getenv("GDM_WATCH_RETRY_SECONDS", "60"))
+
+is_test = os.getenv("TESTCLUSTER", "").lower() == "true"
+portal_base = os.getenv("GDM_PORTAL_URL") or ("https://aidev.gdm.se" if is_test else "https://ai.gdm.se")
+
+def load_gdm_config():
+    with open(config_path, "r") as f:
+        return json.loads(f.read()) or {}
+
+def build_provider_config(config):
+    return {
+        "name": "GDM",
+        "provider_type": "openai",
+        "config": {
+            "endpoint": f"{portal_base}/api/v1"
+        },
+        "credentials": {
+            "api_key": config.get("apiKey", "")
+        },
+        "is_active": config.get("enabled", False)
+    }
+
+def build_mcp_server_config(config):
+    return {
+        "name": "GDM MCP Gateway",
+        "http_url": f"{portal_base}/api/v1/mcp",
+        "http_auth_type": "bearer",
+        "http_auth_config_schema": {
+            "token": config.get("apiKey", "")
+        },
+        "description": "GDM AI MCP Gateway",
+        "documentation_url": f"{portal_base}/api-docs",
+    }
+
+gdm_config = load_gdm_config()
+provider_config = build_provider_config(gdm_config)
+mcp_server_config = build_mcp_server_config(gdm_config)
+
+def load_model_catalog():
+    """Read the compiled model catalog (see charts/eneo/catalog/models.yaml)."""
+    with open(model_catalog_path, "r") as f:
+        return json.load(f)
+
+compiled_catalog = load_model_catalog()
+completion_models = compiled_catalog["tenant_models"]["completion"]
+embedding_models = compiled_catalog["tenant_models"]["embedding"]
+transcription_models = compiled_catalog["tenant_models"]["transcription"]
+
+def model_catalog():
+    return {
+        "completion": completion_models,
+        "embedding": embedding_models,
+        "transcription": transcription_models,
+    }
+
+# ---------------------------------------------------------------------------
+# HTTP client (one pooled keep-alive session shared by all API helpers)
+# ---------------------------------------------------------------------------
+
+def _build_session():
+    """Create a requests session with a sized keep-alive connection pool."""
+    import urllib3
+    urllib3.disable_warnings()
+
+    session = requests.Session()
+    session.verify = False
+    pool_size = http_pool_size * (tenant_workers if all_tenants else 1)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@functools.lru_cache(maxsize=1)
+def http_session():
+    """The shared session, built on the first API call."""
+    return _build_session()
+
+# Per-endpoint latency and phase timings (GDM_JSON_LOGS, GDM_METRICS_FILE, GDM_METRICS_PORT)
+metrics = telemetry.Recorder.from_env("gdm-config-setter", "GDM")
+
+@functools.lru_cache(maxsize=8)
+def _auth_headers(access_token):
+    """Bearer headers for a user token, built once per token."""
+    return {"Authorization": f"Bearer {access_token}"}
+
+_sysadmin_headers = {"X-API-Key": super_api_key}
+
+# Read timeouts for endpoints that are slower (or faster) than GDM_HTTP_READ_TIMEOUT
+endpoint_timeouts = resilience.EndpointTimeouts(
+    default=(http_connect_timeout, http_read_timeout),
+    rules=[
+        ("POST", r"/tools/sync/$", (http_connect_timeout, mcp_sync_deadline)),
+        ("POST", r"/tools/review/approve-all/$", (http_connect_timeout, max(http_read_timeout, 120))),
+        ("POST", r"^/api/v1/mcp-servers/$", (http_connect_timeout, max(http_read_timeout, 120))),
+        ("GET", r"", (http_connect_timeout, min(http_read_timeout, 30))),
+    ],
+)
+
+def _resilience(name):
+    """Retries, timeouts and a circuit breaker of its own for calls to the Eneo API."""
+    return resilience.Resilience(
+        endpoint_timeouts,
+        policy=resilience.RetryPolicy(http_retries, http_backoff, http_backoff_max),
+        breaker=resilience.CircuitBreaker(breaker_threshold, breaker_reset_seconds, name=name),
+    )
+
+resilient = _resilience("Eneo API")
+gateway_resilient = _resilience("GDM MCP gateway")
+
+# In multi-tenant mode, the tenant-scoped calls of a tenant's pass go through that
+# tenant's own breaker and pacing (see tenant_scope), so a failing tenant cannot
+# open the circuit for the others. Sysadmin calls always use the shared breaker.
+_tenant_resilient = contextvars.ContextVar("gdm_tenant_resilient", default=None)
+_tenant_limiter = contextvars.ContextVar("gdm_tenant_limiter", default=None)
+
+# Deadline of the provisioning pass the current thread works for (see run_deadline)
+_deadline = contextvars.ContextVar("gdm_run_deadline", default=None)
+
+# Slots every API call of an asyncio pass holds while in flight (see apply_sections_async)
+_call_slots = contextvars.ContextVar("gdm_call_slots", default=None)
+
+@contextmanager
+def run_deadline():
+    """Bound the API calls of one provisioning pass by GDM_RUN_DEADLINE.
+
+    Nested passes share the outermost deadline. Worker threads see it when
+    started through _submit.
+    """
+    if _deadline.get() is not None:
+        yield
+        return
+    token = _deadline.set(resilience.Deadline(run_deadline_seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def _submit(pool, fn, *args):
+    """pool.submit that carries the caller's run deadline into the worker thread."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+def _classify(response, error):
+    if error is not None:
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return resilience.UNAVAILABLE
+        if isinstance(error, requests.exceptions.ChunkedEncodingError):
+            return resilience.RETRY
+        return resilience.OK
+    return resilience.classify_status(response.status_code)
+
+class _FoundResponse:
+    """Stands in for the response of a create that failed but landed, as found by its recheck.
+
+    Resilience.call returns what recheck() found in place of a response;
+    this wraps it in the part of requests.Response the API helpers use.
+    """
+
+    status_code = 200
+    ok = True
+
+    def __init__(self, found):
+        self.found = found
+        self.text = json.dumps(found)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.found
+
+def _request(method, path, access_token=None, idempotent=None, recheck=None, bounded=True, **kwargs):
+    """Send a request to the Eneo API through the shared session.
+
+    Authenticates with the bearer token when one is given and with
+    ENEO_SUPER_API_KEY otherwise. Transient failures are retried for
+    idempotent methods; pass idempotent=True for POSTs that are safe to
+    repeat, or a recheck() that looks the object of a create up and returns
+    it (or None) so a create is only repeated when it did not land. An open
+    circuit breaker and an exhausted run deadline (unless bounded=False)
+    surface as requests.exceptions.ConnectionError and Timeout.
+    """
+    headers = _auth_headers(access_token) if access_token else _sysadmin_headers
+    calls = (_tenant_resilient.get() or resilient) if access_token else resilient
+    limiter = _tenant_limiter.get() if access_token else None
+    return _send(calls, method, f"{url}{path}", path, headers, limiter, idempotent, recheck, bounded, **kwargs)
+
+def _send(calls, method, request_url, path, headers, limiter=None, idempotent=None, recheck=None, bounded=True,
+          **kwargs):
+    """One call through the shared session and the given Resilience, recorded under path (see _request)."""
+    slots = _call_slots.get()
+    deadline = _deadline.get() if bounded else None
+    timeout = kwargs.pop("timeout", None)
+    attempts = 0
+
+    def send(endpoint_timeout):
+        nonlocal attempts
+        attempts += 1
+        # A caller's timeout replaces the endpoint's, but is clamped to the deadline all the same
+        if timeout is None:
+            request_timeout = endpoint_timeout
+        else:
+            request_timeout = deadline.cap(timeout) if deadline is not None else timeout
+        if limiter is not None:
+            limiter.acquire()
+        if slots is not None:
+            slots.acquire()
+        started = time.monotonic()
         try:
-            response = requests.get(health_url, timeout=5, verify=False)
-            if response.status_code == 200:
-                print("Health check passed! Service is ready.")
-                return
+            response = http_session().request(method, request_url, headers=headers,
+                                              timeout=request_timeout, **kwargs)
         except requests.exceptions.RequestException as e:
-            print(f"Health check failed: {e}")
+            metrics.record_call(method, path, type(e).__name__, time.monotonic() - started, retries=int(attempts > 1))
+            raise
+        finally:
+            if slots is not None:
+                slots.release()
+        metrics.record_call(method, path, response.status_code, time.monotonic() - started, retries=int(attempts > 1))
+        return response
+
+    recheck_response = None
+    if recheck is not None:
+        def recheck_response():
+            item = recheck()
+            return None if item is None else _FoundResponse(item)
+    try:
+        return calls.call(method, path, send, _classify, idempotent=idempotent,
+                          recheck=recheck_response, deadline=deadline)
+    except resilience.CircuitOpenError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from None
+    except resilience.DeadlineExceeded as e:
+        raise requests.exceptions.Timeout(str(e)) from None
 
-        print("Retrying in 5 seconds...")
-        time.sleep(5)
+def _find_named(items, name, key="name"):
+    return next((item for item in items if item.get(key) == name), None)
 
-def _find_owner_role_id(users):
-    """Return the role ID for the predefined 'Owner' role."""
-    for user in users:
-        for role in user.get("roles", []):
-            if role.get("predefined_source") == "Owner" or role.get("name") == "Owner":
-                return role["id"]
+# ---------------------------------------------------------------------------
+# Sidecar state (persisted on the shared data volume between runs)
+# ---------------------------------------------------------------------------
+
+def load_state():
+    """Return the persisted sidecar state, or an empty dict if there is none."""
+    try:
+        with open(state_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+_state_lock = threading.RLock()
+
+def save_state(state):
+    """Atomically persist the sidecar state. Failures are logged, not raised."""
+    tmp_path = f"{state_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(state_dir, exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, state_path)
+    except OSError as e:
+        print(f"Could not persist state to {state_path}: {e}")
+
+@contextmanager
+def updating_state():
+    """Load the state, let the caller modify it and save it, serialised across threads."""
+    with _state_lock:
+        state = load_state()
+        yield state
+        save_state(state)
+
+def _digest(value):
+    """Stable SHA-256 of a JSON-serialisable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+def wait_for_health():
+    """Wait for the API healthz endpoint to return 200. Returns False if GDM_HEALTH_DEADLINE passed."""
+    health_url = f"{url.rstrip('/')}/api/healthz"
+    return readiness.wait_for_http(health_url, deadline=health_deadline or None)
+
+def _find_owner_role_id(user):
+    """Return the ID of the user's predefined 'Owner' role, if it has one."""
+    for role in user.get("roles", []):
+        if role.get("predefined_source") == "Owner" or role.get("name") == "Owner":
+            return role["id"]
     return None
 
+def iter_users():
+    """Yield sysadmin users page by page, fetching the next page only when needed.
+
+    Follows next_cursor when the API returns one and falls back to offset
+    paging otherwise. Stops when a page is short or brings no new users, so
+    an API that ignores the paging parameters costs a single request.
+    """
+    params = {"limit": users_page_size}
+    offset = 0
+    seen = set()
+    while True:
+        response = _request("GET", "/api/v1/sysadmin/users/", params=params)
+        response.raise_for_status()
+        data = response.json()
+        items = data.get("items", []) if isinstance(data, dict) else data
+        new_items = [u for u in items if u.get("id") not in seen]
+        seen.update(u.get("id") for u in new_items)
+        yield from new_items
+
+        next_cursor = data.get("next_cursor") if isinstance(data, dict) else None
+        if next_cursor:
+            params = {"limit": users_page_size, "cursor": next_cursor}
+        elif new_items and len(items) == users_page_size:
+            offset += len(items)
+            params = {"limit": users_page_size, "offset": offset}
+        else:
+            return
 
-def create_temp_admin_user():
+def discover_tenant():
+    """Return (tenant_id, owner_role_id), stopping at the first user with an Owner role.
+
+    The result is cached in the sidecar state and reused by open_admin_session.
+    """
+    found_users = False
+    for user in iter_users():
+        found_users = True
+        admin_role_id = _find_owner_role_id(user)
+        if admin_role_id is not None:
+            tenant_id = user["tenant_id"]
+            with updating_state() as state:
+                state["discovery"] = {"tenant_id": tenant_id, "owner_role_id": admin_role_id}
+            return tenant_id, admin_role_id
+
+    if not found_users:
+        raise RuntimeError("No users found in Eneo – cannot determine tenant")
+    raise RuntimeError("No 'Owner' role found in tenant")
+
+
+def create_temp_admin_user(tenant_id=None, admin_role_id=None):
     """Create a temporary Owner-level user and return (user_id, access_token).
 
     Uses ENEO_SUPER_API_KEY to:
-      1. Scan existing users for the role ID that carries the 'admin' permission.
+      1. Discover the tenant and the 'Owner' role ID, unless both are given.
       2. Create a short-lived service user with that role.
       3. Mint a JWT for the new user.
 
     The caller MUST call delete_temp_admin_user(user_id) when done.
     """
-    sysadmin_headers = {"X-API-Key": super_api_key}
-
-    # List users to discover the tenant ID and the admin role ID
-    users_url = f"{url}/api/v1/sysadmin/users/"
-    response = requests.get(users_url, headers=sysadmin_headers, verify=False)
-    response.raise_for_status()
-    users = response.json().get("items", [])
-    if not users:
-        raise RuntimeError("No users found in Eneo – cannot determine tenant")
-
-    tenant_id = users[0]["tenant_id"]
-    admin_role_id = _find_owner_role_id(users)
-    if admin_role_id is None:
-        raise RuntimeError("No 'Owner' role found in tenant")
+    if tenant_id is None or admin_role_id is None:
+        tenant_id, admin_role_id = discover_tenant()
 
     # Create a temporary service user with the admin role
     tag = uuid.uuid4().hex[:8]
@@ -159,14 +455,14 @@ def create_temp_admin_user():
         "tenant_id": tenant_id,
         "roles": [{"id": admin_role_id}],
     }
-    response = requests.post(users_url, headers=sysadmin_headers, json=payload, verify=False)
+    response = _request("POST", "/api/v1/sysadmin/users/", json=payload,
+                        recheck=lambda: _find_named(iter_users(), payload["email"], key="email"))
     response.raise_for_status()
     user_id = response.json()["id"]
     print(f"Created temp admin user {payload['email']} ({user_id})")
 
     # Mint a JWT for the temp user
-    token_url = f"{url}/api/v1/sysadmin/users/{user_id}/access-token/"
-    response = requests.post(token_url, headers=sysadmin_headers, verify=False)
+    response = _request("POST", f"/api/v1/sysadmin/users/{user_id}/access-token/", idempotent=True)
     response.raise_for_status()
     access_token = response.json()
     return user_id, access_token
@@ -174,64 +470,92 @@ def create_temp_admin_user():
 
 def delete_temp_admin_user(user_id):
     """Delete the temporary service user created by create_temp_admin_user."""
-    sysadmin_headers = {"X-API-Key": super_api_key}
-    delete_url = f"{url}/api/v1/sysadmin/users/{user_id}/"
-    response = requests.delete(delete_url, headers=sysadmin_headers, verify=False)
+    # Cleanup is not bound by the run deadline, a temp user must not outlive the pass
+    response = _request("DELETE", f"/api/v1/sysadmin/users/{user_id}/", bounded=False)
     response.raise_for_status()
     print(f"Deleted temp admin user {user_id}")
 
+def open_admin_session():
+    """Create the temp admin user and return (tenant_id, user_id, access_token).
+
+    Uses the cached tenant and Owner role from the last discovery. The user
+    create call doubles as the revalidation: if the API rejects the cached
+    IDs, the cache is dropped and discovery runs again.
+    """
+    cached = load_state().get("discovery")
+    if cached:
+        tenant_id, admin_role_id = cached["tenant_id"], cached["owner_role_id"]
+        try:
+            return (tenant_id, *create_temp_admin_user(tenant_id, admin_role_id))
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code >= 500:
+                raise
+            print(f"Cached tenant/role rejected ({e.response.status_code}), rediscovering...")
+
+    tenant_id, admin_role_id = discover_tenant()
+    return (tenant_id, *create_temp_admin_user(tenant_id, admin_role_id))
+
 def get_model_providers(access_token):
-    api_url = f"{url}/api/v1/admin/model-providers/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(api_url, headers=headers, verify=False)
+    response = _request("GET", "/api/v1/admin/model-providers/", access_token)
     response.raise_for_status()
     return response.json()
 
 def create_model_provider(access_token, provider_data):
-    api_url = f"{url}/api/v1/admin/model-providers/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, json=provider_data, verify=False)
+    response = _request("POST", "/api/v1/admin/model-providers/", access_token, json=provider_data,
+                        recheck=lambda: _find_named(get_model_providers(access_token), provider_data["name"]))
     response.raise_for_status()
     return response.json()
 
 def update_model_provider(access_token, provider_id, provider_data):
-    api_url = f"{url}/api/v1/admin/model-providers/{provider_id}/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.put(api_url, headers=headers, json=provider_data, verify=False)
+    response = _request("PUT", f"/api/v1/admin/model-providers/{provider_id}/", access_token, json=provider_data)
     response.raise_for_status()
     return response.json()
 
-def ensure_model_provider(access_token, provider_data):
-    """Create or update the model provider based on whether one named 'GDM' already exists."""
-    model_providers = get_model_providers(access_token)
-    existing = next(
-        (p for p in model_providers if p.get("name") == "GDM"),
-        None
-    )
+def ensure_model_provider(access_token, provider_data, snapshot=None):
+    """Create or update the model provider, skipping the write when nothing changed.
+
+    The API does not echo credentials back, so they are compared against a
+    digest of the last credentials this sidecar applied to the provider
+    (see load_state).
+    """
+    name = provider_data["name"]
+    if snapshot is not None:
+        existing = snapshot["providers"].get(name)
+    else:
+        existing = next((p for p in get_model_providers(access_token) if p.get("name") == name), None)
+
+    credentials_digest = _digest(provider_data.get("credentials", {}))
+    managed_fields = {k: v for k, v in provider_data.items() if k != "credentials"}
 
     if existing:
         provider_id = existing["id"]
-        print(f"Model provider 'GDM' already exists (id={provider_id}), updating...")
+        applied_credentials = load_state().get("providers", {}).get(provider_id)
+        if not _differs(managed_fields, existing) and applied_credentials == credentials_digest:
+            print(f"Model provider '{name}' unchanged (id={provider_id}).")
+            return existing
+        print(f"Model provider '{name}' already exists (id={provider_id}), updating...")
         result = update_model_provider(access_token, provider_id, provider_data)
-        print("Updated:", json.dumps(result, indent=2))
+        print(f"Model provider '{name}' updated.")
     else:
-        print("Model provider 'GDM' not found, creating...")
+        print(f"Model provider '{name}' not found, creating...")
         result = create_model_provider(access_token, provider_data)
-        print("Created:", json.dumps(result, indent=2))
+        print(f"Model provider '{name}' created (id={result['id']}).")
 
+    with updating_state() as state:
+        state.setdefault("providers", {})[result["id"]] = credentials_digest
     return result
 
 def get_ai_models(access_token):
-    api_url = f"{url}/api/v1/ai-models/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(api_url, headers=headers, verify=False)
+    response = _request("GET", "/api/v1/ai-models/", access_token)
     response.raise_for_status()
     return response.json()
 
+def _find_ai_model(access_token, kind, name):
+    return _find_named(get_ai_models(access_token).get(f"{kind}_models", []), name)
+
 def create_completion_model(access_token, model_data):
-    api_url = f"{url}/api/v1/admin/tenant-models/completion/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, json=model_data, verify=False)
+    response = _request("POST", "/api/v1/admin/tenant-models/completion/", access_token, json=model_data,
+                        recheck=lambda: _find_ai_model(access_token, "completion", model_data["name"]))
     if not response.ok:
         print(
             f"Completion model create failed for '{model_data.get('name')}' "
@@ -241,9 +565,7 @@ def create_completion_model(access_token, model_data):
     return response.json()
 
 def update_completion_model(access_token, model_id, model_data):
-    api_url = f"{url}/api/v1/admin/tenant-models/completion/{model_id}/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.put(api_url, headers=headers, json=model_data, verify=False)
+    response = _request("PUT", f"/api/v1/admin/tenant-models/completion/{model_id}/", access_token, json=model_data)
     if not response.ok:
         print(
             f"Completion model update failed for '{model_data.get('name')}' "
@@ -252,143 +574,213 @@ def update_completion_model(access_token, model_id, model_data):
     response.raise_for_status()
     return response.json()
 
-def ensure_completion_models(access_token, provider_id, models):
-    """Create or update completion models for the given provider."""
-    ai_models = get_ai_models(access_token)
-    existing_completion = ai_models.get("completion_models", [])
-    existing_by_name = {m["name"]: m for m in existing_completion if m.get("name")}
-
-    for model in models:
-        model_data = {**model, "provider_id": provider_id}
-        name = model["name"]
-
-        try:
-            if name in existing_by_name:
-                model_id = existing_by_name[name]["id"]
-                print(f"Completion model '{name}' already exists (id={model_id}), updating...")
-                result = update_completion_model(access_token, model_id, model_data)
-                print("Updated:", json.dumps(result, indent=2))
-            else:
-                print(f"Completion model '{name}' not found, creating...")
-                result = create_completion_model(access_token, model_data)
-                print("Created:", json.dumps(result, indent=2))
-        except requests.exceptions.HTTPError as e:
-            print(f"Skipping completion model '{name}' due to API validation error: {e}")
-            continue
-
 def create_embedding_model(access_token, model_data):
-    api_url = f"{url}/api/v1/admin/tenant-models/embedding/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, json=model_data, verify=False)
+    response = _request("POST", "/api/v1/admin/tenant-models/embedding/", access_token, json=model_data,
+                        recheck=lambda: _find_ai_model(access_token, "embedding", model_data["name"]))
     response.raise_for_status()
     return response.json()
 
 def update_embedding_model(access_token, model_id, model_data):
-    api_url = f"{url}/api/v1/admin/tenant-models/embedding/{model_id}/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.put(api_url, headers=headers, json=model_data, verify=False)
+    response = _request("PUT", f"/api/v1/admin/tenant-models/embedding/{model_id}/", access_token, json=model_data)
     response.raise_for_status()
     return response.json()
 
-def ensure_embedding_models(access_token, provider_id, models):
-    """Create or update embedding models for the given provider."""
-    ai_models = get_ai_models(access_token)
-    existing_embedding = ai_models.get("embedding_models", [])
-    existing_by_name = {m["name"]: m for m in existing_embedding if m.get("name")}
-
-    for model in models:
-        model_data = {**model, "provider_id": provider_id}
-        name = model["name"]
-
-        if name in existing_by_name:
-            model_id = existing_by_name[name]["id"]
-            print(f"Embedding model '{name}' already exists (id={model_id}), updating...")
-            result = update_embedding_model(access_token, model_id, model_data)
-            print("Updated:", json.dumps(result, indent=2))
-        else:
-            print(f"Embedding model '{name}' not found, creating...")
-            result = create_embedding_model(access_token, model_data)
-            print("Created:", json.dumps(result, indent=2))
-
 def create_transcription_model(access_token, model_data):
-    api_url = f"{url}/api/v1/admin/tenant-models/transcription/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, json=model_data, verify=False)
+    response = _request("POST", "/api/v1/admin/tenant-models/transcription/", access_token, json=model_data,
+                        recheck=lambda: _find_ai_model(access_token, "transcription", model_data["name"]))
     response.raise_for_status()
     return response.json()
 
 def update_transcription_model(access_token, model_id, model_data):
-    api_url = f"{url}/api/v1/admin/tenant-models/transcription/{model_id}/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.put(api_url, headers=headers, json=model_data, verify=False)
+    response = _request("PUT", f"/api/v1/admin/tenant-models/transcription/{model_id}/", access_token, json=model_data)
     response.raise_for_status()
     return response.json()
 
-def ensure_transcription_models(access_token, provider_id, models):
-    """Create or update transcription models for the given provider."""
+
+# ---------------------------------------------------------------------------
+# Model reconciliation (upserts fanned out over a bounded worker pool)
+# ---------------------------------------------------------------------------
+
+model_writers = {
+    "completion": (create_completion_model, update_completion_model),
+    "embedding": (create_embedding_model, update_embedding_model),
+    "transcription": (create_transcription_model, update_transcription_model),
+}
+
+def fetch_snapshot(access_token):
+    """Fetch providers and AI models once and index them by kind and name."""
+    providers = get_model_providers(access_token)
     ai_models = get_ai_models(access_token)
-    existing_transcription = ai_models.get("transcription_models", [])
-    existing_by_name = {m["name"]: m for m in existing_transcription if m.get("name")}
-
-    for model in models:
-        model_data = {**model, "provider_id": provider_id}
-        name = model["name"]
-
-        if name in existing_by_name:
-            model_id = existing_by_name[name]["id"]
-            print(f"Transcription model '{name}' already exists (id={model_id}), updating...")
-            result = update_transcription_model(access_token, model_id, model_data)
-            print("Updated:", json.dumps(result, indent=2))
-        else:
-            print(f"Transcription model '{name}' not found, creating...")
-            result = create_transcription_model(access_token, model_data)
-            print("Created:", json.dumps(result, indent=2))
+    return {
+        "providers": {p["name"]: p for p in providers if p.get("name")},
+        "models": {
+            kind: {m["name"]: m for m in ai_models.get(f"{kind}_models", []) if m.get("name")}
+            for kind in model_writers
+        },
+    }
 
+def _differs(desired, actual):
+    """Return True if a field we manage differs between desired and actual.
+
+    Fields the API does not return are not compared; nested dicts are
+    compared on the desired keys only.
+    """
+    for key, value in desired.items():
+        if key not in actual:
+            continue
+        if isinstance(value, dict) and isinstance(actual[key], dict):
+            if _differs(value, actual[key]):
+                return True
+        elif actual[key] != value:
+            return True
+    return False
+
+def plan_models(snapshot, provider_id, models_by_kind):
+    """Diff desired models against the snapshot.
+
+    Returns a list of (action, kind, model_data, existing) tuples where
+    action is one of "create", "update" or "unchanged".
+    """
+    plan = []
+    for kind, models in models_by_kind.items():
+        existing_by_name = snapshot["models"].get(kind, {})
+        for model in models:
+            model_data = {**model, "provider_id": provider_id}
+            existing = existing_by_name.get(model["name"])
+            if existing is None:
+                action = "create"
+            else:
+                actual = existing
+                if "provider_id" not in actual and isinstance(actual.get("provider"), dict):
+                    actual = {**actual, "provider_id": actual["provider"].get("id")}
+                action = "update" if _differs(model_data, actual) else "unchanged"
+            plan.append((action, kind, model_data, existing))
+    return plan
+
+def _upsert_model(access_token, action, kind, model_data, existing):
+    """Create or update a single model of the given kind."""
+    create, update = model_writers[kind]
+    name = model_data["name"]
+    label = kind.capitalize()
+
+    if action == "update":
+        model_id = existing["id"]
+        print(f"{label} model '{name}' changed (id={model_id}), updating...")
+        result = update(access_token, model_id, model_data)
+        print(f"{label} model '{name}' updated.")
+    else:
+        print(f"{label} model '{name}' not found, creating...")
+        result = create(access_token, model_data)
+        print(f"{label} model '{name}' created (id={result.get('id', '?')}).")
+    return result
+
+def ensure_models(access_token, provider_id, models_by_kind, snapshot=None, workers=None, record_kinds=False):
+    """Create or update models of every kind for the given provider.
+
+    Only models that are missing or differ from the snapshot are written.
+    Upserts are independent and run concurrently on a bounded thread pool.
+    Kinds listed in GDM_RECONCILE_SERIAL_KINDS are applied one model at a
+    time in list order. A failing model is skipped and recorded; the
+    returned dict maps (kind, name) to the error for every skipped model.
+    With record_kinds, each kind is recorded as a models.<kind> phase
+    lasting until its last upsert finished.
+    """
+    started = time.monotonic()
+    if snapshot is None:
+        snapshot = fetch_snapshot(access_token)
+
+    plan = plan_models(snapshot, provider_id, models_by_kind)
+    counts = {action: sum(1 for p in plan if p[0] == action) for action in ("unchanged", "update", "create")}
+    print(
+        f"Model plan: {counts['unchanged']} unchanged, "
+        f"{counts['update']} updated, {counts['create']} created"
+    )
+
+    # Each batch is applied in order by a single worker
+    batches = []
+    serial = {}
+    for item in plan:
+        if item[0] == "unchanged":
+            continue
+        if item[1] in reconcile_serial_kinds:
+            serial.setdefault(item[1], []).append(item)
+        else:
+            batches.append([item])
+    batches.extend(serial.values())
+
+    failures = {}
+    # Batches left per kind; every batch holds models of a single kind
+    pending = {kind: sum(1 for batch in batches if batch[0][1] == kind) for kind in models_by_kind}
+    failed_kinds = set()
+    pending_lock = threading.Lock()
+
+    def kind_done(kind):
+        if record_kinds:
+            metrics.record_phase(f"models.{kind}", time.monotonic() - started, kind not in failed_kinds)
+
+    def apply(batch):
+        failed = False
+        for action, kind, model_data, existing in batch:
+            try:
+                _upsert_model(access_token, action, kind, model_data, existing)
+            except requests.exceptions.RequestException as e:
+                print(f"Skipping {kind} model '{model_data['name']}' due to API error: {e}")
+                failures[(kind, model_data["name"])] = e
+                failed = True
+        kind = batch[0][1]
+        with pending_lock:
+            if failed:
+                failed_kinds.add(kind)
+            pending[kind] -= 1
+            done = not pending[kind]
+        if done:
+            kind_done(kind)
+
+    for kind, left in pending.items():
+        if not left:
+            kind_done(kind)
+
+    if batches:
+        with ThreadPoolExecutor(max_workers=workers or reconcile_workers) as pool:
+            for future in [_submit(pool, apply, batch) for batch in batches]:
+                future.result()
+
+    return failures
 
 # ---------------------------------------------------------------------------
 # MCP server provisioning (creates MCP server entry in Eneo)
 # ---------------------------------------------------------------------------
 
 def get_mcp_servers(access_token):
-    api_url = f"{url}/api/v1/mcp-servers/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(api_url, headers=headers, verify=False)
+    response = _request("GET", "/api/v1/mcp-servers/", access_token)
     response.raise_for_status()
     data = response.json()
     return data.get("items", data) if isinstance(data, dict) else data
 
 def create_mcp_server(access_token, server_data):
-    api_url = f"{url}/api/v1/mcp-servers/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, json=server_data, verify=False)
+    response = _request("POST", "/api/v1/mcp-servers/", access_token, json=server_data,
+                        recheck=lambda: _find_named(get_mcp_servers(access_token), server_data["name"]))
     response.raise_for_status()
     return response.json()
 
 def update_mcp_server(access_token, server_id, server_data):
-    api_url = f"{url}/api/v1/mcp-servers/{server_id}/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, json=server_data, verify=False)
+    response = _request("POST", f"/api/v1/mcp-servers/{server_id}/", access_token, json=server_data, idempotent=True)
     response.raise_for_status()
     return response.json()
 
 def enable_mcp_server_for_tenant(access_token, server_id):
-    api_url = f"{url}/api/v1/mcp-servers/settings/{server_id}/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, json={}, verify=False)
+    response = _request("POST", f"/api/v1/mcp-servers/settings/{server_id}/", access_token, json={}, idempotent=True)
     response.raise_for_status()
     return response.json()
 
 def sync_mcp_server_tools(access_token, server_id):
-    api_url = f"{url}/api/v1/mcp-servers/{server_id}/tools/sync/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, verify=False)
+    response = _request("POST", f"/api/v1/mcp-servers/{server_id}/tools/sync/", access_token, idempotent=True)
     response.raise_for_status()
     return response.json()
 
 def approve_all_mcp_tools(access_token, server_id):
-    api_url = f"{url}/api/v1/mcp-servers/{server_id}/tools/review/approve-all/"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.post(api_url, headers=headers, verify=False)
+    response = _request("POST", f"/api/v1/mcp-servers/{server_id}/tools/review/approve-all/", access_token,
+                        idempotent=True)
     response.raise_for_status()
     return response.json()
 
@@ -420,67 +812,808 @@ def ensure_mcp_server(access_token, server_data):
 
     return result
 
+def _enable_mcp_for_tenant(access_token, server_id):
+    try:
+        enable_mcp_server_for_tenant(access_token, server_id)
+        print(f"[MCP] Enabled MCP server for tenant.")
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 409:
+            print("[MCP] MCP server already enabled for tenant.")
+        else:
+            raise
+
+def _sync_mcp_tools(access_token, server_id, manifest=None):
+    """Sync tools from the gateway and approve pending changes. Returns False if the sync failed.
+
+    On success the gateway manifest digest the sync corresponds to is
+    recorded, so later passes can skip the sync while it holds.
+    """
+    sync_result = sync_mcp_server_tools(access_token, server_id)
+    connection = sync_result.get("connection", {})
+    if not connection.get("success"):
+        print(f"[MCP] Tool sync connection failed: {connection.get('error_message', 'unknown error')}")
+        return False
+
+    new_count = len(sync_result.get("new_tools", []))
+    changed_count = len(sync_result.get("changed_tools", []))
+    unchanged = sync_result.get("unchanged_count", 0)
+    print(f"[MCP] Tool sync: {new_count} new, {changed_count} changed, {unchanged} unchanged.")
+
+    # Auto-approve any pending changes
+    if sync_result.get("has_pending_changes"):
+        approve_all_mcp_tools(access_token, server_id)
+        print("[MCP] Approved all pending tool changes.")
+
+    with updating_state() as state:
+        state.setdefault("mcp_tools", {})[server_id] = {
+            "server": _digest(mcp_server_config),
+            "manifest": manifest,
+            "tools": new_count + changed_count + unchanged,
+            "synced_at": int(time.time()),
+        }
+    return True
+
+def _mcp_rpc(method, params, request_id=None, mcp_session_id=None):
+    """POST one JSON-RPC message to the GDM MCP gateway (streamable HTTP transport)."""
+    headers = {
+        "Authorization": f"Bearer {gdm_config.get('apiKey', '')}",
+        "Accept": "application/json, text/event-stream",
+    }
+    if mcp_session_id:
+        headers["Mcp-Session-Id"] = mcp_session_id
+    message = {"jsonrpc": "2.0", "method": method, "params": params}
+    if request_id is not None:
+        message["id"] = request_id
+    gateway_url = mcp_server_config["http_url"]
+    response = _send(gateway_resilient, "POST", gateway_url, urllib.parse.urlsplit(gateway_url).path, headers,
+                     idempotent=True, json=message)
+    response.raise_for_status()
+    return response
+
+def _rpc_result(response):
+    """The result of a JSON-RPC response sent as plain JSON or as a server-sent event."""
+    if response.headers.get("Content-Type", "").startswith("text/event-stream"):
+        messages = [json.loads(line[5:]) for line in response.text.splitlines() if line.startswith("data:")]
+        message = next((m for m in messages if "result" in m or "error" in m), None)
+        if message is None:
+            raise ValueError("no JSON-RPC response in event stream")
+    else:
+        message = response.json()
+    if "error" in message:
+        raise ValueError(f"JSON-RPC error {message['error']}")
+    return message.get("result", {})
+
+def fetch_tool_manifest():
+    """Digest of the tools the gateway currently exposes, or None if it could not be read.
+
+    Lists the tools straight from the gateway over MCP, which is far cheaper
+    than having Eneo reconnect and rediscover every tool.
+    """
+    try:
+        response = _mcp_rpc("initialize", {
+            "protocolVersion": "2025-03-26",
+            "capabilities": {},
+            "clientInfo": {"name": "gdm-config-setter", "version": "1"},
+        }, request_id=1)
+        _rpc_result(response)
+        mcp_session_id = response.headers.get("Mcp-Session-Id")
+        _mcp_rpc("notifications/initialized", {}, mcp_session_id=mcp_session_id)
+
+        tools = []
+        cursor = None
+        request_id = 2
+        while True:
+            result = _rpc_result(_mcp_rpc("tools/list", {"cursor": cursor} if cursor else {},
+                                          request_id, mcp_session_id))
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                break
+            request_id += 1
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"[MCP] Could not read the gateway tool manifest: {e}")
+        return None
+
+    return _digest(sorted(
+        ({"name": t.get("name"), "description": t.get("description"), "inputSchema": t.get("inputSchema")}
+         for t in tools),
+        key=lambda t: t["name"] or "",
+    ))
+
+def _tools_in_sync(entry, manifest):
+    """True if a recorded sync matches the current server config and gateway manifest."""
+    return (
+        manifest is not None
+        and entry.get("manifest") == manifest
+        and entry.get("server") == _digest(mcp_server_config)
+    )
+
+def sync_mcp_tools_if_changed(access_token, server_id, manifest=None):
+    """Run the Eneo tool sync only if the gateway manifest moved since the last one."""
+    if manifest is None:
+        manifest = metrics.timed("mcp.manifest", fetch_tool_manifest)
+    if _tools_in_sync(load_state().get("mcp_tools", {}).get(server_id, {}), manifest):
+        print("[MCP] Gateway tool manifest unchanged, skipping tool sync.")
+        return True
+    return _sync_mcp_tools(access_token, server_id, manifest)
+
+def _mark_tools_pending(server_id):
+    """Register a server with the background tool sync without forcing a resync of a known one."""
+    with updating_state() as state:
+        state.setdefault("mcp_tools", {}).setdefault(server_id, {"manifest": None})
+
+def sync_mcp_tools_step(access_token, manifest=None):
+    """Sync the tools of the tenant's existing GDM MCP server if the gateway manifest moved."""
+    if not gdm_config.get("apiKey", ""):
+        return True
+    try:
+        server = next((s for s in get_mcp_servers(access_token) if s.get("name") == mcp_server_config["name"]), None)
+        if server is None:
+            print("[MCP] MCP server not provisioned yet, nothing to sync.")
+            return True
+        return sync_mcp_tools_if_changed(access_token, server["id"], manifest)
+    except Exception as e:
+        _report_mcp_error(e)
+        return False
+
+def _report_mcp_error(e):
+    if isinstance(e, requests.exceptions.HTTPError):
+        print(f"[MCP] HTTP error during MCP setup: {e}")
+        if e.response is not None:
+            print(f"[MCP] Response: {e.response.text[:500]}")
+    else:
+        print(f"[MCP] Error during MCP setup: {e}")
+
 def setup_mcp(access_token):
-    """Set up the GDM MCP Gateway in Eneo: create server, enable for tenant, sync & approve tools."""
+    """Set up the GDM MCP Gateway in Eneo: create server, enable for tenant, sync & approve tools.
+
+    The tool sync runs inline only with GDM_MCP_SYNC_INLINE; otherwise the
+    background scheduler (mcp_sync_loop) picks it up. Returns False if any
+    step failed.
+    """
     api_key = gdm_config.get("apiKey", "")
     if not api_key:
         print("[MCP] No API key configured, skipping MCP setup.")
-        return
+        return True
 
     try:
         server = ensure_mcp_server(access_token, mcp_server_config)
         server_id = server.get("id")
         if not server_id:
             print("[MCP] Could not determine server ID, skipping further setup.")
-            return
+            return False
 
         # Enable MCP server for the tenant
-        try:
-            enable_mcp_server_for_tenant(access_token, server_id)
-            print(f"[MCP] Enabled MCP server for tenant.")
-        except requests.exceptions.HTTPError as e:
-            if e.response is not None and e.response.status_code == 409:
-                print("[MCP] MCP server already enabled for tenant.")
-            else:
-                raise
+        _enable_mcp_for_tenant(access_token, server_id)
 
-        # Sync tools from the gateway
-        sync_result = sync_mcp_server_tools(access_token, server_id)
-        connection = sync_result.get("connection", {})
-        if connection.get("success"):
-            new_count = len(sync_result.get("new_tools", []))
-            changed_count = len(sync_result.get("changed_tools", []))
-            unchanged = sync_result.get("unchanged_count", 0)
-            print(f"[MCP] Tool sync: {new_count} new, {changed_count} changed, {unchanged} unchanged.")
-
-            # Auto-approve any pending changes
-            if sync_result.get("has_pending_changes"):
-                approve_all_mcp_tools(access_token, server_id)
-                print("[MCP] Approved all pending tool changes.")
+        # Sync tools from the gateway, now or on the background schedule
+        if mcp_sync_inline:
+            return sync_mcp_tools_if_changed(access_token, server_id)
+        _mark_tools_pending(server_id)
+        return True
+    except Exception as e:
+        _report_mcp_error(e)
+        return False
+
+# ---------------------------------------------------------------------------
+# Applied-configuration fingerprint (skips provisioning on unchanged restarts)
+# ---------------------------------------------------------------------------
+
+def mcp_enabled():
+    return gdm_config.get("enabled", False) and gdm_config.get("mcpEnabled", True)
+
+def section_fingerprints():
+    """Content hashes of the independently applicable parts of the configuration."""
+    return {
+        "provider": _digest(provider_config),
+        "models": _digest(model_catalog()),
+        "mcp": _digest({"enabled": mcp_enabled(), "server": mcp_server_config}),
+    }
+
+def config_fingerprint():
+    """Content hash over everything a provisioning run applies."""
+    return _digest({"gdm_config": gdm_config, "sections": section_fingerprints()})
+
+def list_tenants():
+    response = _request("GET", "/api/v1/sysadmin/tenants/")
+    response.raise_for_status()
+    data = response.json()
+    return data.get("items", []) if isinstance(data, dict) else data
+
+def verify_applied(applied, owner_role_id=None):
+    """Check that the provider the configuration was applied to still exists unchanged.
+
+    Provider endpoints are tenant-scoped and the sysadmin API has no
+    equivalent, so this mints a temp user in the applied tenant, lists its
+    providers and deletes the user again: four calls instead of a full pass.
+    owner_role_id defaults to the one cached by discover_tenant.
+    """
+    tenant_id, provider_id = applied.get("tenant_id"), applied.get("provider_id")
+    owner_role_id = owner_role_id or load_state().get("discovery", {}).get("owner_role_id")
+    if not (tenant_id and provider_id and owner_role_id):
+        return False
+    try:
+        with run_deadline():
+            temp_user_id, access_token = create_temp_admin_user(tenant_id, owner_role_id)
+            try:
+                provider = _find_named(get_model_providers(access_token), provider_id, key="id")
+            finally:
+                delete_temp_admin_user(temp_user_id)
+    except requests.exceptions.RequestException as e:
+        print(f"Fingerprint verification failed: {e}")
+        return False
+    if provider is None:
+        print(f"Model provider {provider_id} no longer exists in Eneo, re-provisioning.")
+        return False
+    if _differs({k: v for k, v in provider_config.items() if k != "credentials"}, provider):
+        print(f"Model provider {provider_id} was changed in Eneo, re-provisioning.")
+        return False
+    return True
+
+def _applied_record(state, tenant_id=None):
+    """The applied-configuration record: one per tenant in multi-tenant mode."""
+    if all_tenants:
+        return state.get("tenants", {}).get(tenant_id, {}).get("applied", {})
+    return state.get("applied", {})
+
+def is_applied(fingerprint):
+    """Return True if this exact configuration was already applied and still holds."""
+    if force_provision:
+        return False
+    applied = _applied_record(load_state())
+    if applied.get("fingerprint") != fingerprint:
+        return False
+    age = time.time() - applied.get("applied_at", 0)
+    if age > fingerprint_max_age:
+        print(f"Applied configuration is {int(age)}s old, re-provisioning.")
+        return False
+    return verify_applied(applied)
+
+def changed_sections(tenant_id=None):
+    """Return the sections whose fingerprint differs from the last applied run.
+
+    In multi-tenant mode without a tenant_id, the union over all known tenants.
+    """
+    state = load_state()
+    if all_tenants and tenant_id is None:
+        records = [_applied_record(state, tid) for tid in state.get("tenants", {})] or [{}]
+    else:
+        records = [_applied_record(state, tenant_id)]
+    return {
+        name
+        for record in records
+        for name, digest in section_fingerprints().items()
+        if record.get("sections", {}).get(name) != digest
+    }
+
+def record_applied(sections, tenant_id, provider_id):
+    """Persist the fingerprints of successfully applied sections with a timestamp."""
+    with updating_state() as state:
+        applied = dict(_applied_record(state, tenant_id))
+        current = section_fingerprints()
+        recorded = {**applied.get("sections", {}), **{name: current[name] for name in sections if name in current}}
+        applied.update({
+            "sections": recorded,
+            "applied_at": int(time.time()),
+            "tenant_id": tenant_id,
+            "provider_id": provider_id,
+        })
+        # The full fingerprint only holds once every section is in sync
+        if recorded == current:
+            applied["fingerprint"] = config_fingerprint()
         else:
-            print(f"[MCP] Tool sync connection failed: {connection.get('error_message', 'unknown error')}")
+            applied.pop("fingerprint", None)
+        if all_tenants:
+            state.setdefault("tenants", {}).setdefault(tenant_id, {})["applied"] = applied
+        else:
+            state["applied"] = applied
+
+def _effective_sections(sections, snapshot):
+    """Models must be (re)applied as well when the provider is about to be created."""
+    sections = set(sections) | {"provider"}
+    if provider_config["name"] not in snapshot["providers"]:
+        sections.add("models")
+    return sections
+
+def _ensure_catalog(access_token, provider_id, models_by_kind, snapshot, record_kinds=False):
+    """ensure_models that reports failed models. Returns False if any model failed."""
+    failures = ensure_models(access_token, provider_id, models_by_kind, snapshot, record_kinds=record_kinds)
+    if failures:
+        print(f"{len(failures)} model(s) failed to reconcile: "
+              + ", ".join(f"{kind}/{name}" for kind, name in failures))
+    return not failures
+
+def apply_sections(access_token, sections):
+    """Apply the given sections one after another.
+
+    The provider is always reconciled (a cheap no-op when unchanged) because
+    models hang off its id. All model kinds share one plan and one worker
+    pool; each kind is still timed as its own models.<kind> phase, as in
+    the asyncio engine. Returns (provider, applied sections, ok).
+    """
+    snapshot = metrics.timed("snapshot", fetch_snapshot, access_token)
+    provider = metrics.timed("provider", ensure_model_provider, access_token, provider_config, snapshot)
+    sections = _effective_sections(sections, snapshot)
+    ok = True
+
+    if "models" in sections:
+        ok = _ensure_catalog(access_token, provider["id"], model_catalog(), snapshot, record_kinds=True) and ok
+
+    if "mcp" in sections and mcp_enabled():
+        ok = metrics.timed("mcp", setup_mcp, access_token) and ok
+    return provider, sections, ok
+
+def _apply(access_token, sections):
+    """apply_sections on the configured engine."""
+    if provision_engine == "asyncio":
+        # Imported on first use, the threads engine never pays for it
+        import asyncio
+
+        return asyncio.run(apply_sections_async(access_token, sections))
+    return apply_sections(access_token, sections)
+
+def provision(sections=("provider", "models", "mcp")):
+    """Run one provisioning pass over the given sections. Returns True if everything was applied."""
+    with run_deadline():
+        tenant_id, temp_user_id, access_token = metrics.timed("temp_user", open_admin_session)
+        try:
+            provider, applied, ok = _apply(access_token, sections)
+        finally:
+            delete_temp_admin_user(temp_user_id)
+            metrics.flush()
+
+    if ok:
+        record_applied(applied, tenant_id, provider["id"])
+    return ok
+
+# ---------------------------------------------------------------------------
+# Multi-tenant fan-out (GDM_ALL_TENANTS=true)
+# ---------------------------------------------------------------------------
 
+class RateLimiter:
+    """Space calls at least 1/rate seconds apart across all threads sharing it."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+@contextmanager
+def tenant_scope(tenant_id):
+    """Give one tenant's pass its own run deadline, circuit breaker and pacing.
+
+    The breaker and pacing apply to the tenant-scoped (user token) calls;
+    sysadmin calls keep the shared breaker. Worker threads started through
+    _submit and asyncio steps inherit the scope.
+    """
+    limiter = RateLimiter(tenant_rate_limit) if tenant_rate_limit > 0 else None
+    scoped = [
+        (_deadline, _deadline.set(resilience.Deadline(run_deadline_seconds))),
+        (_tenant_resilient, _tenant_resilient.set(_resilience(f"Eneo API for tenant {tenant_id}"))),
+        (_tenant_limiter, _tenant_limiter.set(limiter)),
+    ]
+    try:
+        yield
+    finally:
+        for var, token in reversed(scoped):
+            var.reset(token)
+
+def _scan_owner_roles(tenant_ids):
+    """Scan the user list for an Owner role in each tenant, stopping once all are found."""
+    missing = set(tenant_ids)
+    owner_roles = {}
+    if not missing:
+        return owner_roles
+    for user in iter_users():
+        tenant_id = user.get("tenant_id")
+        if tenant_id in missing:
+            role_id = _find_owner_role_id(user)
+            if role_id is not None:
+                owner_roles[tenant_id] = role_id
+                missing.discard(tenant_id)
+                if not missing:
+                    break
+    with updating_state() as state:
+        for tenant_id, role_id in owner_roles.items():
+            state.setdefault("tenants", {}).setdefault(tenant_id, {})["owner_role_id"] = role_id
+    return owner_roles
+
+def discover_tenants():
+    """Return ({tenant_id: name}, {tenant_id: owner_role_id}) for every tenant.
+
+    Owner roles cached in the state are reused, so the user list is only
+    scanned for tenants seen for the first time.
+    """
+    tenants = {t["id"]: t.get("name") or t["id"] for t in list_tenants()}
+    if not tenants:
+        raise RuntimeError("No tenants found in Eneo")
+    cached = load_state().get("tenants", {})
+    owner_roles = {
+        tenant_id: cached[tenant_id]["owner_role_id"]
+        for tenant_id in tenants
+        if cached.get(tenant_id, {}).get("owner_role_id")
+    }
+    owner_roles.update(_scan_owner_roles(set(tenants) - set(owner_roles)))
+    return tenants, owner_roles
+
+def _pending_sections(tenant_id, fingerprint):
+    """Sections to apply to a tenant; none while its applied fingerprint is current."""
+    applied = _applied_record(load_state(), tenant_id)
+    if (
+        not force_provision
+        and applied.get("fingerprint") == fingerprint
+        and time.time() - applied.get("applied_at", 0) <= fingerprint_max_age
+    ):
+        return set()
+    return changed_sections(tenant_id) or {"provider", "models", "mcp"}
+
+def provision_tenant(tenant_id, owner_role_id, sections):
+    """Provision one tenant through its own temp user. Returns (applied sections, ok)."""
+    try:
+        temp_user_id, access_token = create_temp_admin_user(tenant_id, owner_role_id)
     except requests.exceptions.HTTPError as e:
-        print(f"[MCP] HTTP error during MCP setup: {e}")
-        if e.response is not None:
-            print(f"[MCP] Response: {e.response.text[:500]}")
+        if e.response is None or e.response.status_code >= 500:
+            raise
+        print(f"Owner role of tenant {tenant_id} rejected ({e.response.status_code}), rediscovering...")
+        owner_role_id = _scan_owner_roles({tenant_id}).get(tenant_id)
+        if owner_role_id is None:
+            raise RuntimeError("No 'Owner' role found in tenant")
+        temp_user_id, access_token = create_temp_admin_user(tenant_id, owner_role_id)
+
+    try:
+        provider, applied, ok = _apply(access_token, sections)
+    finally:
+        delete_temp_admin_user(temp_user_id)
+
+    if ok:
+        record_applied(applied, tenant_id, provider["id"])
+    return applied, ok
+
+def _provision_tenant_isolated(tenant_id, owner_role_id, sections):
+    """provision_tenant that reports failures instead of raising. Returns (status, seconds, detail).
+
+    Empty sections mean the tenant's fingerprint is current: its provider is
+    verified and everything is provisioned again only if that fails.
+    """
+    started = time.monotonic()
+    try:
+        with tenant_scope(tenant_id):
+            if sections or not verify_applied(_applied_record(load_state(), tenant_id), owner_role_id):
+                applied, ok = provision_tenant(tenant_id, owner_role_id, sections or {"provider", "models", "mcp"})
+                status, detail = ("ok" if ok else "failed"), ", ".join(sorted(applied))
+            else:
+                status, detail = "unchanged", ""
     except Exception as e:
-        print(f"[MCP] Error during MCP setup: {e}")
+        status, detail = "failed", f"{type(e).__name__}: {e}"
+    seconds = time.monotonic() - started
+    metrics.record_phase(f"tenant.{tenant_id}", seconds, status != "failed")
+    return status, seconds, detail
+
+def provision_tenants(sections=None):
+    """Provision every tenant over a pool of GDM_TENANT_WORKERS, one temp user each.
+
+    Without sections, each tenant gets whatever is not current for it and
+    tenants with a current fingerprint only have their provider verified
+    (see verify_applied); explicit sections are
+    applied to all tenants. Each tenant runs under its own tenant_scope,
+    so a failing tenant neither stops the others nor trips their breaker.
+    Prints a per-tenant summary and returns True if no tenant failed.
+    """
+    with run_deadline():
+        tenants, owner_roles = metrics.timed("discovery", discover_tenants)
+        fingerprint = config_fingerprint()
+        results = {}
+        with ThreadPoolExecutor(max_workers=tenant_workers) as pool:
+            futures = {}
+            for tenant_id in tenants:
+                tenant_sections = set(sections) if sections is not None else _pending_sections(tenant_id, fingerprint)
+                if tenant_id not in owner_roles:
+                    results[tenant_id] = ("failed", 0.0, "no Owner role found")
+                else:
+                    futures[tenant_id] = _submit(
+                        pool, _provision_tenant_isolated, tenant_id, owner_roles[tenant_id], tenant_sections
+                    )
+            for tenant_id, future in futures.items():
+                results[tenant_id] = future.result()
+    metrics.flush()
+
+    counts = {"ok": 0, "unchanged": 0, "failed": 0}
+    for status, _, _ in results.values():
+        counts[status] += 1
+    print(f"[TENANTS] {len(tenants)} tenant(s): {counts['ok']} provisioned, "
+          f"{counts['unchanged']} unchanged, {counts['failed']} failed")
+    for tenant_id in sorted(tenants, key=tenants.get):
+        status, seconds, detail = results[tenant_id]
+        print(f"[TENANTS]   {status:<9} {tenants[tenant_id]} ({tenant_id}) {seconds:.1f}s {detail}".rstrip())
+    return counts["failed"] == 0
 
+# ---------------------------------------------------------------------------
+# asyncio provisioning engine (GDM_ENGINE=asyncio)
+# ---------------------------------------------------------------------------
 
-if __name__ == "__main__":
-    wait_for_health()
-    temp_user_id, access_token = create_temp_admin_user()
+def _within(seconds, func, *args):
+    """Call func with its API calls bounded by a deadline of seconds (or the run's, if sooner)."""
+    deadline = resilience.Deadline(seconds)
+    run = _deadline.get()
+    if run is not None and run.expires_at is not None and (
+        deadline.expires_at is None or run.expires_at < deadline.expires_at
+    ):
+        deadline = run
+    token = _deadline.set(deadline)
     try:
-        provider = ensure_model_provider(access_token, provider_config)
-        ensure_completion_models(access_token, provider["id"], completion_models)
-        ensure_embedding_models(access_token, provider["id"], embedding_models)
-        ensure_transcription_models(access_token, provider["id"], transcription_models)
+        return func(*args)
+    finally:
+        _deadline.reset(token)
+
+async def _run_step(name, seconds, func, *args):
+    """Run a blocking step in a worker thread under its own deadline of seconds.
+
+    The deadline is the step's run deadline: every API call of the step is
+    clamped to it and none is started after it, so the thread returns by
+    then instead of outliving the step.
+    """
+    import asyncio
 
-        if gdm_config.get("enabled", False) and gdm_config.get("mcpEnabled", True):
-            setup_mcp(access_token)
+    started = time.monotonic()
+    try:
+        result = await asyncio.to_thread(_within, seconds, metrics.timed, name, func, *args)
     finally:
-        delete_temp_admin_user(temp_user_id)
+        if seconds and time.monotonic() - started >= seconds:
+            print(f"[ASYNC] Step '{name}' hit its {seconds:g}s deadline.")
+    print(f"[ASYNC] Step '{name}' done in {time.monotonic() - started:.2f}s.")
+    return result
+
+async def _setup_mcp_async(access_token):
+    """setup_mcp with every API step under its own deadline."""
+    if not gdm_config.get("apiKey", ""):
+        print("[MCP] No API key configured, skipping MCP setup.")
+        return True
+
+    try:
+        server = await _run_step("mcp.server", step_deadline, ensure_mcp_server, access_token, mcp_server_config)
+        server_id = server.get("id")
+        if not server_id:
+            print("[MCP] Could not determine server ID, skipping further setup.")
+            return False
+        await _run_step("mcp.enable", step_deadline, _enable_mcp_for_tenant, access_token, server_id)
+        if not mcp_sync_inline:
+            _mark_tools_pending(server_id)
+            return True
+        return await _run_step("mcp.sync", mcp_sync_deadline, sync_mcp_tools_if_changed, access_token, server_id)
+    except Exception as e:
+        _report_mcp_error(e)
+        return False
 
+async def apply_sections_async(access_token, sections):
+    """Async variant of apply_sections.
+
+    The snapshot and provider go first; the model kinds and the MCP setup
+    then run side by side, since they only need the provider id and the
+    access token. All API calls of the pass share GDM_ASYNC_CONCURRENCY
+    slots, whichever step or reconcile worker makes them. Returns
+    (provider, applied sections, ok).
+    """
+    import asyncio
+
+    _call_slots.set(threading.BoundedSemaphore(async_concurrency))
+    snapshot = await _run_step("snapshot", step_deadline, fetch_snapshot, access_token)
+    provider = await _run_step("provider", step_deadline, ensure_model_provider, access_token, provider_config, snapshot)
+    sections = _effective_sections(sections, snapshot)
+
+    branches = []
+    if "models" in sections:
+        for kind, models in model_catalog().items():
+            branches.append(_run_step(f"models.{kind}", step_deadline,
+                                      _ensure_catalog, access_token, provider["id"], {kind: models}, snapshot))
+    if "mcp" in sections and mcp_enabled():
+        branches.append(_setup_mcp_async(access_token))
+
+    ok = True
+    for result in await asyncio.gather(*branches, return_exceptions=True):
+        if isinstance(result, BaseException):
+            print(f"[ASYNC] Provisioning step failed: {result!r}")
+            ok = False
+        elif result is False:
+            ok = False
+    return provider, sections, ok
+
+# ---------------------------------------------------------------------------
+# Watch mode (apply gdm.json changes in place, periodic drift check)
+# ---------------------------------------------------------------------------
+
+def _config_signature():
+    """Identity of the mounted gdm.json; changes when kubelet swaps the ConfigMap symlink."""
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def reload_config():
+    """Re-read gdm.json and rebuild the derived configs. Returns False if it is unreadable."""
+    global gdm_config, provider_config, mcp_server_config
+    try:
+        config = load_gdm_config()
+    except (OSError, ValueError) as e:
+        print(f"[WATCH] Could not read {config_path}: {e}")
+        return False
+    gdm_config = config
+    provider_config = build_provider_config(config)
+    mcp_server_config = build_mcp_server_config(config)
+    return True
+
+def _provision_safely(sections):
+    try:
+        if all_tenants:
+            return provision_tenants(sections)
+        return provision(sections)
+    except requests.exceptions.RequestException as e:
+        print(f"[WATCH] Provisioning failed: {e}")
+    except RuntimeError as e:
+        print(f"[WATCH] Provisioning failed: {e}")
+    return False
+
+def watch_config():
+    """Poll gdm.json for changes and reapply only the sections that changed.
+
+    A change is applied once the file has been stable for the debounce
+    period. Every GDM_DRIFT_CHECK_SECONDS a full diff-based reconcile runs
+    to repair changes made in Eneo behind our back. Failed passes are
+    retried after GDM_WATCH_RETRY_SECONDS.
+    """
+    print(f"[WATCH] Watching {config_path} (poll {watch_poll_seconds}s, "
+          f"drift check every {drift_check_seconds}s)")
+    signature = _config_signature()
+    last_drift_check = time.monotonic()
+    retry_at = 0.0
+
+    while True:
+        time.sleep(watch_poll_seconds)
+
+        current = _config_signature()
+        if current != signature:
+            # Wait for the file to settle before reading it
+            time.sleep(watch_debounce_seconds)
+            if _config_signature() != current:
+                continue
+            signature = current
+            retry_at = 0.0
+            if not reload_config():
+                continue
+
+        now = time.monotonic()
+        if now < retry_at:
+            continue
+
+        pending = changed_sections()
+        if pending:
+            print(f"[WATCH] Configuration changed: {', '.join(sorted(pending))}")
+            ok = _provision_safely(pending)
+        elif now - last_drift_check >= drift_check_seconds:
+            print("[WATCH] Running drift check against Eneo")
+            ok = _provision_safely(("provider", "models", "mcp"))
+            last_drift_check = now
+        else:
+            continue
+
+        if not ok:
+            print(f"[WATCH] Retrying in {watch_retry_seconds}s")
+            retry_at = time.monotonic() + watch_retry_seconds
+
+# ---------------------------------------------------------------------------
+# Scheduled MCP tool sync (off the startup path)
+# ---------------------------------------------------------------------------
+
+def _sync_tenant_tools(tenant_id, owner_role_id, manifest):
+    """Sync one tenant's MCP tools through its own temp user. Returns False if it failed."""
+    try:
+        with tenant_scope(tenant_id):
+            temp_user_id, access_token = create_temp_admin_user(tenant_id, owner_role_id)
+            try:
+                return sync_mcp_tools_step(access_token, manifest)
+            finally:
+                delete_temp_admin_user(temp_user_id)
+    except Exception as e:
+        print(f"[MCP] Tool sync of tenant {tenant_id} failed: {e}")
+        return False
+
+def sync_tools(manifest):
+    """Sync the MCP tools against manifest with one temp user per tenant, and nothing else."""
+    with run_deadline():
+        if not all_tenants:
+            _, temp_user_id, access_token = metrics.timed("temp_user", open_admin_session)
+            try:
+                return metrics.timed("mcp.tools", sync_mcp_tools_step, access_token, manifest)
+            finally:
+                delete_temp_admin_user(temp_user_id)
+
+        tenants, owner_roles = metrics.timed("discovery", discover_tenants)
+        with ThreadPoolExecutor(max_workers=tenant_workers) as pool:
+            futures = [
+                _submit(pool, _sync_tenant_tools, tenant_id, owner_roles[tenant_id], manifest)
+                for tenant_id in tenants if tenant_id in owner_roles
+            ]
+        return all([future.result() for future in futures])
+
+def mcp_sync_pass():
+    """One scheduled tool sync: a cheap manifest check, then a sync only where needed.
+
+    A manifest that cannot be read says nothing about the tools, so the
+    pass is skipped (and retried sooner) rather than treated as a change.
+    """
+    if not mcp_enabled() or not gdm_config.get("apiKey", ""):
+        return True
+    manifest = metrics.timed("mcp.manifest", fetch_tool_manifest)
+    if manifest is None:
+        print("[MCP] Gateway tool manifest unknown, skipping this tool sync.")
+        return False
+    synced = load_state().get("mcp_tools", {})
+    if synced and all(_tools_in_sync(entry, manifest) for entry in synced.values()):
+        print("[MCP] Gateway tool manifest unchanged, no tool sync needed.")
+        return True
+    print("[MCP] Gateway tools changed or not yet synced, syncing...")
+    try:
+        return sync_tools(manifest)
+    except (requests.exceptions.RequestException, RuntimeError) as e:
+        print(f"[MCP] Scheduled tool sync failed: {e}")
+        return False
+
+def mcp_sync_loop():
+    """Run mcp_sync_pass every GDM_MCP_SYNC_INTERVAL seconds.
+
+    The first pass waits one interval too: the startup pass has just
+    created or checked the server, and Eneo discovers its tools on create.
+    """
+    delay = mcp_sync_interval
+    while True:
+        time.sleep(delay)
+        try:
+            ok = mcp_sync_pass()
+        except Exception as e:
+            print(f"[MCP] Scheduled tool sync failed: {e}")
+            ok = False
+        metrics.flush()
+        delay = mcp_sync_interval if ok else min(watch_retry_seconds, mcp_sync_interval)
+
+def start_mcp_sync_scheduler():
+    """Start the background tool sync thread, unless tools are synced inline or never."""
+    if mcp_sync_inline or mcp_sync_interval <= 0:
+        return None
+    thread = threading.Thread(target=mcp_sync_loop, name="mcp-sync", daemon=True)
+    thread.start()
+    print(f"[MCP] Tool sync scheduled every {mcp_sync_interval:g}s")
+    return thread
+
+def main():
+    """Wait for the API, provision unless already applied, then sync MCP tools and watch in the background."""
+    metrics.serve()
+    if not metrics.timed("health", wait_for_health):
+        metrics.flush()
+        raise SystemExit(1)
+    if all_tenants:
+        provision_tenants()
+    elif is_applied(config_fingerprint()):
+        print("Configuration unchanged since last successful run, skipping provisioning.")
+        metrics.flush()
+    else:
+        provision()
+
+    sync_thread = start_mcp_sync_scheduler()
+    if watch_enabled:
+        watch_config()
+
+    if sync_thread is None:
+        http_session().close()
+
+if __name__ == "__main__":
+    main()
     while True:
-        time.sleep(86400)  # Sleep for 24 hours at a time
\ No newline at end of file
+        time.sleep(86400)  # Sleep for 24 hours at a time
@@ -1,78 +1,79 @@
+import hashlib
+import json
+import os
+import uuid
+
 import yaml
 
-models = { "completion_models": [], "embedding_models": [] }
-
-models["completion_models"].append({
-    "name": "gemma3-27b-it",
-    "nickname": "gemma3-27b-it",
-    "family": "openai",
-    "token_limit": 128000,
-    "max_input_tokens": 128000,
-    "max_output_tokens": 4096,
-    "stability": "stable",
-    "is_deprecated": False,
-    "hosting": "swe",
-    "description": "Google's Gemma 3 27B instruction-tuned model, hosted by GDM in Sweden (ai.gdm.se).",
-    "org": "GDM",
-    "vision": True,
-    "reasoning": False,
-    "litellm_model_name": "gdm/gemma3-27b-it"
-})
-
-models["completion_models"].append({
-    "name": "gemma4-31b-it",
-    "nickname": "gemma4-31b-it",
-    "family": "openai",
-    "token_limit": 256000,
-    "max_input_tokens": 256000,
-    "max_output_tokens": 65536,
-    "stability": "stable",
-    "is_deprecated": False,
-    "hosting": "swe",
-    "description": "Google's Gemma 4 31B instruction-tuned model, hosted by GDM in Sweden (ai.gdm.se).",
-    "org": "GDM",
-    "vision": True,
-    "reasoning": True,
-    "litellm_model_name": "gdm/gemma4-31b-it"
-})
-
-models["completion_models"].append({
-    "name": "gpt-oss-120b",
-    "nickname": "gpt-oss-120b",
-    "family": "openai",
-    "token_limit": 128000,
-    "max_input_tokens": 128000,
-    "max_output_tokens": 4096,
-    "stability": "stable",
-    "is_deprecated": False,
-    "hosting": "swe",
-    "description": "OpenAIs open model gpt-oss-120b, hosted by GDM in Sweden (ai.gdm.se).",
-    "org": "GDM",
-    "vision": False,
-    "reasoning": False,
-    "litellm_model_name": "gdm/gpt-oss-120b"
-})
-
-models["embedding_models"].append({
-    "name": "multilingual-e5-large-instruct",
-    "family": "e5",
-    "open_source": True,
-    "max_input": 1400,
-    "max_batch_size": 32,
-    "is_deprecated": False,
-    "stability": "stable",
-    "hosting": "swe",
-    "description": "GDM's E5 multilingual embedding model with instruction tuning, hosted in Sweden (ai.gdm.se).",
-    "org": "GDM",
-    "litellm_model_name": "gdm/multilingual-e5-large-instruct"
-})
-
-# Write models to YAML file
+# libyaml's C emitter when PyYAML was built with it, the pure-Python one otherwise
+try:
+    from yaml import CSafeDumper as Dumper
+except ImportError:
+    from yaml import SafeDumper as Dumper
+
+# Compiled from charts/eneo/catalog/models.yaml, shared with gdm.py
+catalog_path = os.getenv(
+    "MODEL_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_catalog.json"),
+)
+
+# On the shared-data PVC, read by the backend and worker pods
 output_path = "/app/data/ai_models.yml"
 
-with open(output_path, 'w') as f:
-    yaml.dump(models, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
 
-print(f"Models written to {output_path}")
+def render(catalog):
+    """Render ai_models.yml in memory."""
+    header = f"# Generated from the GDM model catalog (sha256 {catalog['sha256']})\n"
+    body = yaml.dump(catalog["ai_models"], Dumper=Dumper, default_flow_style=False,
+                     sort_keys=False, allow_unicode=True)
+    return (header + body).encode("utf-8")
+
+
+def file_digest(path):
+    """SHA-256 of the file at path, or None if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def write_atomic(path, data):
+    """Write data to a temp file next to path, fsync it and rename it into place.
+
+    Readers on other pods see either the old or the new file, never a
+    partial one.
+    """
+    directory = os.path.dirname(path) or "."
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+with open(catalog_path) as f:
+    catalog = json.load(f)
 
+rendered = render(catalog)
 
+if file_digest(output_path) == hashlib.sha256(rendered).hexdigest():
+    print(f"Models unchanged in {output_path}, not rewriting")
+else:
+    write_atomic(output_path, rendered)
+    print(f"Models written to {output_path}")
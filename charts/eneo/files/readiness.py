@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Readiness waiting shared by the chart bootstrap scripts.
+
+Polls a probe until it succeeds or a deadline passes. Polling starts fast
+and backs off exponentially with jitter, so a service that comes up
+quickly is noticed within a fraction of a second while a slow one is not
+hammered. HTTP probes are preceded by a plain TCP connect, which fails
+fast while nothing is listening yet. Only the standard library is used so
+the module also runs on bare python images.
+
+The n8n chart ships a copy of this module; edit this one and run
+tools/sync_shared_modules.py.
+"""
+
+import random
+import socket
+import time
+from urllib.parse import urlsplit
+
+
+def tcp_check(host, port, timeout=2.0):
+    """Return True if a TCP connection to host:port can be opened."""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def http_check(url, timeout=5.0, verify_tls=False):
+    """Return True if a GET on url answers with a 2xx status."""
+    # Imported on first use, TCP-only waits (wait_for_db.py) never pay for them
+    import ssl
+    import urllib.error
+    import urllib.request
+
+    context = None
+    if url.startswith("https://") and not verify_tls:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    try:
+        with urllib.request.urlopen(url, timeout=timeout, context=context) as resp:
+            return 200 <= resp.status < 300
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+def wait_until(probe, name, deadline=None, max_attempts=None, initial_delay=0.25,
+               max_delay=5.0, factor=1.6, jitter=0.2, prefix=""):
+    """Call probe() until it returns a truthy value.
+
+    deadline is the overall budget in seconds and max_attempts caps the
+    number of probes; None means unbounded. The delay between probes grows
+    from initial_delay by factor up to max_delay, with +/- jitter applied
+    as a fraction of the delay. Returns True once ready, False if the
+    budget ran out.
+    """
+    started = time.monotonic()
+    give_up_at = started + deadline if deadline else None
+    delay = initial_delay
+    attempt = 0
+
+    while True:
+        attempt += 1
+        if probe():
+            print(f"{prefix}{name} ready after {time.monotonic() - started:.1f}s ({attempt} probes)")
+            return True
+
+        if max_attempts is not None and attempt >= max_attempts:
+            break
+        sleep_for = delay * random.uniform(1 - jitter, 1 + jitter)
+        if give_up_at is not None:
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                break
+            sleep_for = min(sleep_for, remaining)
+        if attempt == 1 or delay >= max_delay:
+            print(f"{prefix}Waiting for {name} (attempt {attempt}, next probe in {sleep_for:.1f}s)...")
+        time.sleep(sleep_for)
+        delay = min(delay * factor, max_delay)
+
+    print(f"{prefix}{name} not ready after {time.monotonic() - started:.1f}s ({attempt} probes)")
+    return False
+
+
+def wait_for_http(url, deadline=None, timeout=5.0, verify_tls=False, prefix="", **backoff):
+    """Wait until url answers 2xx, checking that its port accepts TCP connections first."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+
+    def probe():
+        return (
+            tcp_check(parts.hostname, port, timeout=min(timeout, 2.0))
+            and http_check(url, timeout=timeout, verify_tls=verify_tls)
+        )
+
+    return wait_until(probe, url, deadline=deadline, prefix=prefix, **backoff)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Retries, timeouts and circuit breaking shared by the chart bootstrap scripts.
+
+Every API call goes through Resilience.call(), which
+
+  * picks a (connect, read) timeout for the endpoint from EndpointTimeouts,
+    clamped to what is left of the run's Deadline,
+  * retries transient failures with exponential backoff and jitter, but only
+    for idempotent methods; a create (POST) is retried only after a recheck
+    callback confirmed the first attempt did not land,
+  * refuses to call at all while the CircuitBreaker is open, i.e. after
+    several consecutive failed attempts (retryable or unavailable).
+
+The module does not know which HTTP library is used: the caller passes a
+send(timeout) function for one attempt and a classify(result, error)
+function that tells successes from retryable and unavailable outcomes.
+Only the standard library is used so the module also runs on bare python
+images.
+
+The n8n chart ships a copy of this module; edit this one and run
+tools/sync_shared_modules.py.
+"""
+
+import random
+import re
+import threading
+import time
+
+# Outcomes returned by a classify(result, error) function
+OK = "ok"                    # done, hand the result (or error) to the caller
+RETRY = "retry"              # transient failure of this request
+UNAVAILABLE = "unavailable"  # the API looks down
+# Both failures count towards the breaker; only OK resets it
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"})
+RETRY_STATUSES = frozenset({408, 429, 500})
+UNAVAILABLE_STATUSES = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an API whose circuit breaker is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the run deadline leaves no time for another attempt."""
+
+
+def classify_status(status):
+    """Outcome for an HTTP status code."""
+    if status in UNAVAILABLE_STATUSES:
+        return UNAVAILABLE
+    if status in RETRY_STATUSES:
+        return RETRY
+    return OK
+
+
+class Deadline:
+    """Overall time budget of a run; seconds of None or 0 means unbounded."""
+
+    def __init__(self, seconds=None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def cap(self, timeout):
+        """Clamp a timeout (a number or a (connect, read) tuple) to the time left."""
+        left = self.remaining()
+        if left is None:
+            return timeout
+        if isinstance(timeout, tuple):
+            return tuple(min(t, left) for t in timeout)
+        return min(timeout, left)
+
+
+class EndpointTimeouts:
+    """Per-endpoint timeouts.
+
+    rules is a list of (method, path_regex, timeout) tuples; the first rule
+    whose method matches (None matches any) and whose regex is found in
+    the path wins. Timeouts are a number or a (connect, read) tuple.
+    """
+
+    def __init__(self, default, rules=()):
+        self.default = default
+        self.rules = [(method, re.compile(pattern), timeout) for method, pattern, timeout in rules]
+
+    def get(self, method, path):
+        for rule_method, pattern, timeout in self.rules:
+            if rule_method in (None, method) and pattern.search(path):
+                return timeout
+        return self.default
+
+
+class CircuitBreaker:
+    """Stop calling an API after failure_threshold consecutive failures.
+
+    Once open, calls are refused for reset_timeout seconds; after that a
+    single trial call is let through (half-open). Its success closes the
+    breaker, its failure opens it again. Thread-safe.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, name="API", prefix=""):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """Return True if a call may be made now."""
+        with self._lock:
+            if self._opened_at is None or self.failure_threshold <= 0:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"{self.prefix}{self.name} is answering again, circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            reopen = self._trial_running
+            self._trial_running = False
+            if self.failure_threshold > 0 and (reopen or (self._opened_at is None and self._failures >= self.failure_threshold)):
+                self._opened_at = time.monotonic()
+                print(f"{self.prefix}{self.name} unavailable after {self._failures} failures, "
+                      f"circuit open for {self.reset_timeout:g}s")
+
+
+class RetryPolicy:
+    """Exponential backoff with +/- jitter (a fraction of the delay)."""
+
+    def __init__(self, retries=3, initial_delay=0.5, max_delay=8.0, factor=2.0, jitter=0.2):
+        self.retries = retries
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.jitter = jitter
+
+    def delay(self, retry):
+        """Seconds to wait before the given retry (1-based)."""
+        delay = min(self.initial_delay * self.factor ** (retry - 1), self.max_delay)
+        return max(delay * (1 + random.uniform(-self.jitter, self.jitter)), 0.0)
+
+
+class Resilience:
+    """Runs single API calls with timeouts, retries, a deadline and a breaker."""
+
+    def __init__(self, timeouts, policy=None, breaker=None, deadline=None, prefix=""):
+        self.timeouts = timeouts
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker
+        self.deadline = deadline
+        self.prefix = prefix
+
+    def call(self, method, path, send, classify, idempotent=None, recheck=None, deadline=None):
+        """Call send(timeout) until it succeeds or retrying is not allowed.
+
+        classify(result, error) maps the attempt's return value or the
+        exception it raised to OK, RETRY or UNAVAILABLE. idempotent defaults
+        to the method's semantics. For other calls a failed attempt is only
+        retried when recheck() returns None, i.e. the write did not land;
+        whatever else recheck() returns is returned in place of a result.
+
+        After the last attempt the final result is returned or its
+        exception raised, so callers handle errors as they would without
+        retries; a non-idempotent call is rechecked first even then, so a
+        write that landed is not reported as failed. Raises
+        CircuitOpenError while the breaker is open and DeadlineExceeded
+        when the deadline leaves no room for an attempt.
+        """
+        deadline = deadline or self.deadline or Deadline()
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry = 0
+        while True:
+            if deadline.expired():
+                raise DeadlineExceeded(f"run deadline reached before {method} {path}")
+            if self.breaker is not None and not self.breaker.allow():
+                raise CircuitOpenError(f"{self.breaker.name} circuit open, not calling {method} {path}")
+
+            result = error = None
+            try:
+                result = send(deadline.cap(self.timeouts.get(method, path)))
+            except Exception as e:
+                error = e
+            outcome = classify(result, error)
+
+            if self.breaker is not None:
+                if outcome == OK:
+                    self.breaker.success()
+                else:
+                    self.breaker.failure()
+
+            if outcome != OK and not idempotent:
+                if recheck is None:
+                    outcome = OK
+                else:
+                    found = recheck()
+                    if found is not None:
+                        print(f"{self.prefix}{method} {path} failed ({_reason(result, error)}) but the write landed")
+                        return found
+
+            if outcome != OK and retry < self.policy.retries:
+                retry += 1
+                delay = self.policy.delay(retry)
+                left = deadline.remaining()
+                if left is None or delay < left:
+                    print(f"{self.prefix}{method} {path} failed ({_reason(result, error)}), "
+                          f"retry {retry}/{self.policy.retries} in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+            if error is not None:
+                raise error
+            return result
+
+
+def _reason(result, error):
+    """Short description of a failed attempt for log lines."""
+    if error is not None:
+        return getattr(error, "code", None) or type(error).__name__
+    for attribute in ("status_code", "status", "code"):
+        status = getattr(result, attribute, None)
+        if status is not None:
+            return status
+    return "error"
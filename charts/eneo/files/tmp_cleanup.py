@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Quota-aware cleanup of the shared tmp volume (shared-tmp-cleanup CronJob).
+
+Indexes every entry directly under the volume root (one directory per job)
+with its size on disk and the newest modification time anywhere inside it,
+scanning the entries in parallel with os.scandir. Then it evicts job
+directories:
+
+1. those not modified for TMP_CLEANUP_OLDER_THAN_HOURS, as before;
+2. while the volume is above TMP_CLEANUP_TARGET_FILL_PERCENT, further
+   ones oldest first until the projected fill is under the target.
+
+Directories modified within TMP_CLEANUP_ACTIVE_MINUTES are still being
+written and are never evicted. Each directory is scanned again right before
+its deletion and kept if anything inside it was modified since the index was
+built; a write landing between that rescan and the delete itself is not
+caught, which the active window is there to make unlikely. Deletes run on
+TMP_CLEANUP_WORKERS threads. Bytes and entries freed, entries kept because
+they changed, the fill level before and after and the time taken are logged
+and exported through telemetry (TMP_CLEANUP_JSON_LOGS,
+TMP_CLEANUP_METRICS_FILE). Only the standard library is used.
+"""
+
+import os
+import shutil
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import telemetry
+
+ROOT = os.getenv("TMP_CLEANUP_ROOT", "/shared-tmp")
+OLDER_THAN_HOURS = float(os.getenv("TMP_CLEANUP_OLDER_THAN_HOURS", "48"))
+TARGET_FILL_PERCENT = float(os.getenv("TMP_CLEANUP_TARGET_FILL_PERCENT", "80"))
+ACTIVE_MINUTES = float(os.getenv("TMP_CLEANUP_ACTIVE_MINUTES", "10"))
+WORKERS = int(os.getenv("TMP_CLEANUP_WORKERS", "8"))
+# PVC size ("100Gi"); NFS volumes report the whole export in statvfs, not the claim
+CAPACITY = os.getenv("TMP_CLEANUP_CAPACITY", "")
+DRY_RUN = os.getenv("TMP_CLEANUP_DRY_RUN", "false").lower() == "true"
+
+metrics = telemetry.Recorder.from_env("shared-tmp-cleanup", "TMP_CLEANUP")
+
+_UNITS = {"": 1, "k": 1000, "M": 1000 ** 2, "G": 1000 ** 3, "T": 1000 ** 4,
+          "Ki": 1024, "Mi": 1024 ** 2, "Gi": 1024 ** 3, "Ti": 1024 ** 4}
+
+
+def parse_quantity(quantity):
+    """Bytes in a Kubernetes quantity such as 100Gi or 500M."""
+    number = quantity.rstrip("kMGTi")
+    return int(float(number) * _UNITS[quantity[len(number):]])
+
+
+class Entry:
+    """A top-level entry of the volume: its size on disk and newest mtime (of anything inside)."""
+
+    def __init__(self, path, is_dir, mtime_ns, size=0, newest=0.0):
+        self.path = path
+        self.is_dir = is_dir
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.newest = newest
+
+
+def _human(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+
+def _disk_usage(st):
+    return st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+
+
+def scan_entry(path):
+    """Index one top-level entry; entries vanishing mid-scan are counted as far as they were seen."""
+    st = os.lstat(path)
+    entry = Entry(path, stat.S_ISDIR(st.st_mode), st.st_mtime_ns, _disk_usage(st), st.st_mtime)
+    pending = [path] if entry.is_dir else []
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for child in it:
+                    try:
+                        child_stat = child.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    entry.size += _disk_usage(child_stat)
+                    entry.newest = max(entry.newest, child_stat.st_mtime)
+                    if child.is_dir(follow_symlinks=False):
+                        pending.append(child.path)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return entry
+
+
+def build_index(root, workers=WORKERS):
+    with os.scandir(root) as it:
+        paths = [e.path for e in it]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(scan_entry, path) for path in paths]
+    index = []
+    for path, future in zip(paths, futures):
+        try:
+            index.append(future.result())
+        except FileNotFoundError:
+            pass  # removed by its job while we were scanning
+        except OSError as e:
+            # Left out of the index, so it is never evicted on a partial view
+            print(f"[CLEANUP] Could not scan {path}, skipping it: {e}")
+    return index
+
+
+def volume_usage(root, index):
+    """(used bytes, capacity bytes) of the volume, by the PVC size when CAPACITY is set."""
+    if CAPACITY:
+        return sum(e.size for e in index), parse_quantity(CAPACITY)
+    usage = shutil.disk_usage(root)
+    return usage.used, usage.total
+
+
+def plan_evictions(index, used, capacity, now):
+    """The entries to evict and the number skipped as still active, oldest first."""
+    active_before = now - ACTIVE_MINUTES * 60
+    expired_before = now - OLDER_THAN_HOURS * 3600
+    target = capacity * TARGET_FILL_PERCENT / 100
+    directories = [e for e in index if e.is_dir]
+    candidates = sorted((e for e in directories if e.newest < active_before), key=lambda e: e.newest)
+    skipped = len(directories) - len(candidates)
+
+    evict = []
+    for entry in candidates:
+        if entry.newest >= expired_before and used <= target:
+            break
+        evict.append(entry)
+        used -= entry.size
+    return evict, skipped
+
+
+def evict(entry):
+    """Delete entry unless anything in it was written to since the scan.
+
+    Returns the bytes freed, or None if the entry was kept or already gone.
+    """
+    try:
+        current = scan_entry(entry.path)
+        if current.mtime_ns != entry.mtime_ns or current.newest > entry.newest:
+            print(f"[CLEANUP] Skipping {entry.path}, it changed since the scan")
+            return None
+        if not DRY_RUN:
+            shutil.rmtree(entry.path)
+    except FileNotFoundError:
+        return None
+    return entry.size
+
+
+def run(root=ROOT):
+    started = time.monotonic()
+    with metrics.phase("scan"):
+        index = build_index(root)
+    used, capacity = volume_usage(root, index)
+    fill_before = used / capacity if capacity else 0.0
+    print(f"[CLEANUP] {len(index)} entries, {_human(used)} of {_human(capacity)} ({fill_before:.0%}) used, "
+          f"target {TARGET_FILL_PERCENT:g}%")
+
+    to_evict, skipped = plan_evictions(index, used, capacity, time.time())
+    freed = 0
+    evicted = 0
+    failed = 0
+    with metrics.phase("evict"), ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for entry, future in [(e, pool.submit(evict, e)) for e in to_evict]:
+            try:
+                size = future.result()
+            except OSError as e:
+                print(f"[CLEANUP] Could not delete {entry.path}: {e}")
+                failed += 1
+                continue
+            if size is not None:
+                freed += size
+                evicted += 1
+    changed = len(to_evict) - evicted - failed
+
+    seconds = time.monotonic() - started
+    fill_after = (used - freed) / capacity if capacity else 0.0
+    print(f"[CLEANUP] {'Would free' if DRY_RUN else 'Freed'} {_human(freed)} from "
+          f"{evicted} entries in {seconds:.1f}s ({fill_before:.0%} -> {fill_after:.0%}), "
+          f"{skipped} active and {changed} changed entries skipped")
+    metrics.set_gauge("shared_tmp_bytes_freed", freed, "Bytes freed by the last cleanup run.")
+    metrics.set_gauge("shared_tmp_entries_evicted", evicted, "Entries deleted by the last run.")
+    metrics.set_gauge("shared_tmp_entries_active", skipped, "Entries skipped as still being written.")
+    metrics.set_gauge("shared_tmp_entries_changed", changed, "Entries kept because they changed since the scan.")
+    metrics.set_gauge("shared_tmp_fill_ratio_before", round(fill_before, 4), "Volume fill before the run.")
+    metrics.set_gauge("shared_tmp_fill_ratio_after", round(fill_after, 4), "Volume fill after the run.")
+    metrics.set_gauge("shared_tmp_cleanup_seconds", round(seconds, 3), "Duration of the last cleanup run.")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = run()
+    metrics.flush()
+    raise SystemExit(0 if ok else 1)
@@ -1,64 +1,249 @@
-import psycopg2
-import time
+import os
+import socket
+import struct
 import sys
-from psycopg2 import sql
-from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+import time
+
+import readiness
 
 # Configuration
-class Settings(BaseSettings):
-    model_config = SettingsConfigDict(env_file=".env", extra="allow")
+# Read straight from the environment (and .env, as the backend does); psycopg2
+# is only imported once the server accepts connections, keeping startup cheap.
+def load_env(path=".env"):
+    """Return os.environ overlaid on the KEY=VALUE lines of path, keys lowercased."""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                key, value = line.split("=", 1)
+                values[key.strip().lower()] = value.strip().strip("'\"")
+    except OSError:
+        pass
+    values.update((key.lower(), value) for key, value in os.environ.items())
+    return values
+
+class Settings:
+    def __init__(self, env):
+        missing = [name for name in ("postgres_user", "postgres_host", "postgres_password",
+                                     "postgres_port", "postgres_db") if name not in env]
+        if missing:
+            sys.exit(f"Missing required settings: {', '.join(n.upper() for n in missing)}")
+        self.postgres_user = env["postgres_user"]
+        self.postgres_host = env["postgres_host"]
+        self.postgres_password = env["postgres_password"]
+        self.postgres_port = int(env["postgres_port"])
+        self.postgres_db = env["postgres_db"]
+        # Optional: also wait until this table exists (e.g. alembic_version once migrations ran)
+        self.require_table = env.get("wait_for_db_require_table", "")
+        # More endpoints to wait for, "host[:port][/role]" comma separated; POSTGRES_HOST
+        # is always waited for as the primary, the others default to the replica role
+        self.endpoints = parse_endpoints(env.get("wait_for_db_endpoints", ""), self.postgres_host,
+                                         self.postgres_port)
+        # How many endpoints must be ready: "all", "any" or a number
+        self.require = env.get("wait_for_db_require", "all")
+        # Replicas must have replayed WAL to within this many seconds (empty = no check)
+        lag = env.get("wait_for_db_max_lag_seconds", "")
+        self.max_lag_seconds = float(lag) if lag else None
+        # Overall budget for the wait (seconds)
+        self.deadline = float(env.get("wait_for_db_deadline", "300"))
+
+class Endpoint:
+    def __init__(self, host, port, role):
+        if role not in ("primary", "replica"):
+            sys.exit(f"Unknown database endpoint role '{role}' (use primary or replica)")
+        self.host = host
+        self.port = port
+        self.role = role
+        self.label = f"{host}:{port}"
+
+def parse_endpoints(spec, host, port):
+    endpoints = [Endpoint(host, port, "primary")]
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        address, _, role = entry.partition("/")
+        entry_host, _, entry_port = address.partition(":")
+        endpoint = Endpoint(entry_host, int(entry_port or port), role or "replica")
+        if endpoint.label not in {e.label for e in endpoints}:
+            endpoints.append(endpoint)
+    return endpoints
 
-    postgres_user: str
-    postgres_host: str
-    postgres_password: str
-    postgres_port: int
-    postgres_db: str
+settings = Settings(load_env())
+
+# Protocol-level check (no authentication)
+PROTOCOL_VERSION_3 = 196608
+
+# SQLSTATEs Postgres sends before authentication while it cannot serve us yet
+NOT_READY_SQLSTATES = {
+    "57P03": "cannot connect now",         # starting up, shutting down, in recovery
+    "53300": "too many connections",
+    "3D000": "database does not exist yet",
+}
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("server closed the connection")
+        data += chunk
+    return data
+
+def pg_accepting(host, port, user, dbname, timeout=3.0):
+    """Return (accepting, detail) from the server's answer to a startup packet.
+
+    Postgres answers the startup packet with an authentication request once
+    it accepts connections, and with an error (SQLSTATE 57P03) while it is
+    starting up, shutting down or replaying WAL. The connection is dropped
+    before authenticating, so the probe costs the server no password or
+    SCRAM round trips.
+    """
+    params = b"".join(f"{key}\0{value}\0".encode() for key, value in
+                      (("user", user), ("database", dbname), ("application_name", "wait_for_db")))
+    packet = struct.pack("!ii", 8 + len(params) + 1, PROTOCOL_VERSION_3) + params + b"\0"
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(packet)
+            kind, length = struct.unpack("!ci", _recv_exact(sock, 5))
+            payload = _recv_exact(sock, min(length - 4, 8192))
+    except (OSError, struct.error) as e:
+        return False, f"no startup response ({e})"
 
-    default_tenant_name: Optional[str] = None
-    default_tenant_quota_limit: Optional[int] = None
-    default_user_name: Optional[str] = None
-    default_user_email: Optional[str] = None
-    default_user_password: Optional[str] = None
+    if kind in (b"R", b"v"):
+        # Authentication request or protocol negotiation: the server accepts connections
+        return True, "accepting connections"
+    if kind == b"E":
+        fields = {f[:1]: f[1:].decode(errors="replace") for f in payload.split(b"\0") if f}
+        code = fields.get(b"C", "")
+        message = fields.get(b"M", "")
+        if code in NOT_READY_SQLSTATES:
+            return False, f"{NOT_READY_SQLSTATES[code]} ({code}: {message})"
+        # Anything else (e.g. a pg_hba rejection) still comes from a server that accepts connections
+        return True, f"accepting connections ({code}: {message})"
+    return False, f"unexpected startup response {kind!r}"
 
-settings = Settings()
+# Replay lag of a standby: 0 while it has replayed everything it received
+REPLAY_LAG_SQL = """
+SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+"""
+
+def check_connection(endpoint):
+    """One authenticated connection to endpoint. Returns (ready, detail).
+
+    Asks pg_is_in_recovery(): a primary endpoint must not be in recovery
+    (e.g. a node not yet promoted after a failover), a replica's replay lag
+    must be under WAIT_FOR_DB_MAX_LAG_SECONDS. The optional table check
+    runs on primaries.
+    """
+    import psycopg2
+
+    try:
+        conn = psycopg2.connect(
+            host=endpoint.host,
+            port=endpoint.port,
+            dbname=settings.postgres_db,
+            user=settings.postgres_user,
+            password=settings.postgres_password,
+            connect_timeout=5,
+            application_name="wait_for_db",
+        )
+    except psycopg2.OperationalError as e:
+        return False, str(e).strip().splitlines()[0]
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_is_in_recovery()")
+            in_recovery = cur.fetchone()[0]
+            if endpoint.role == "primary":
+                if in_recovery:
+                    return False, "in recovery, not a primary yet"
+                if settings.require_table:
+                    cur.execute("SELECT to_regclass(%s)", (settings.require_table,))
+                    if cur.fetchone()[0] is None:
+                        return False, f"waiting for table {settings.require_table} (migrations)"
+            elif in_recovery and settings.max_lag_seconds is not None:
+                cur.execute(REPLAY_LAG_SQL)
+                lag = cur.fetchone()[0]
+                if lag is None:
+                    return False, "no WAL replayed yet"
+                if float(lag) > settings.max_lag_seconds:
+                    return False, f"replay lag {float(lag):.1f}s"
+                return True, f"ok, lag {float(lag):.1f}s"
+        return True, "ok"
+    except psycopg2.Error as e:
+        return False, str(e).strip().splitlines()[0]
+    finally:
+        conn.close()
+
+def probe_endpoint(endpoint):
+    """Escalate from TCP to a startup packet to an authenticated check. Returns (ready, detail, seconds)."""
+    started = time.monotonic()
+    if not readiness.tcp_check(endpoint.host, endpoint.port):
+        ready, detail = False, "no TCP"
+    else:
+        ready, detail = pg_accepting(endpoint.host, endpoint.port, settings.postgres_user, settings.postgres_db)
+        if ready:
+            ready, detail = check_connection(endpoint)
+    return ready, detail, time.monotonic() - started
+
+def required_count(require, total):
+    if require == "all":
+        return total
+    if require == "any":
+        return 1
+    return max(1, min(int(require), total))
 
 # Wait for PostgreSQL to be ready
-def wait_for_postgres(max_retries=30, initial_delay=1, max_delay=10):
+def wait_for_postgres(initial_delay=0.5, max_delay=10):
     """
-    Wait for PostgreSQL to be ready with exponential backoff.
-    
+    Wait until the required set of PostgreSQL endpoints is ready.
+
+    Every round probes the endpoints that are not ready yet concurrently.
+    Each probe escalates only as far as the server is ready: a TCP
+    connect, then a startup packet that tells "accepting connections" from
+    "starting up", and only then one authenticated connection (see
+    check_connection). Rounds back off with jitter until
+    WAIT_FOR_DB_DEADLINE; one compact line is printed per round.
+
     Args:
-        max_retries: Maximum number of connection attempts
-        initial_delay: Initial delay in seconds between retries
-        max_delay: Maximum delay in seconds between retries
+        initial_delay: Initial delay in seconds between rounds
+        max_delay: Maximum delay in seconds between rounds
     """
-    delay = initial_delay
-    for attempt in range(max_retries):
-        try:
-            conn = psycopg2.connect(
-                host=settings.postgres_host,
-                port=settings.postgres_port,
-                dbname=settings.postgres_db,
-                user=settings.postgres_user,
-                password=settings.postgres_password,
-                connect_timeout=5
-            )
-            conn.close()
-            print("PostgreSQL is ready!")
-            return True
-        except psycopg2.OperationalError as e:
-            if attempt < max_retries - 1:
-                print(f"PostgreSQL not ready yet (attempt {attempt + 1}/{max_retries}). Waiting {delay}s... Error: {e}")
-                time.sleep(delay)
-                delay = min(delay * 2, max_delay)  # Exponential backoff with cap
-            else:
-                print(f"Failed to connect to PostgreSQL after {max_retries} attempts.")
-                sys.exit(1)
-    return False
+    endpoints = settings.endpoints
+    required = required_count(settings.require, len(endpoints))
+    ready = set()
+    started = time.monotonic()
+    rounds = 0
+
+    def probe():
+        nonlocal rounds
+        rounds += 1
+        pending = [e for e in endpoints if e.label not in ready]
+        if len(pending) == 1:
+            results = [probe_endpoint(pending[0])]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                results = list(pool.map(probe_endpoint, pending))
+
+        cells = []
+        for endpoint, (ok, detail, seconds) in zip(pending, results):
+            if ok:
+                ready.add(endpoint.label)
+            cells.append(f"{endpoint.label} {detail} {seconds * 1000:.0f}ms")
+        print(f"#{rounds} +{time.monotonic() - started:.1f}s {len(ready)}/{required} ready: {' | '.join(cells)}")
+        return len(ready) >= required
+
+    name = "PostgreSQL" if len(endpoints) == 1 else f"PostgreSQL ({required} of {len(endpoints)} endpoints)"
+    if readiness.wait_until(probe, name, deadline=settings.deadline,
+                            initial_delay=initial_delay, max_delay=max_delay, factor=2):
+        return True
+    print(f"PostgreSQL not ready within {settings.deadline:g}s.")
+    sys.exit(1)
 
 # Main script
 if __name__ == "__main__":
     # Wait for PostgreSQL to be ready
     wait_for_postgres()
-    exit(0)
\ No newline at end of file
+    exit(0)
@@ -210,3 +210,28 @@ Validate required values
 {{- fail "copyFrom.releaseName is required when copyFrom.enabled is true" -}}
 {{- end -}}
 {{- end -}}
+
+{{/*
+wait-for-db settings shared by the init containers: the endpoints to wait
+for besides POSTGRES_HOST, how many must be ready, replica lag and deadline
+*/}}
+{{- define "eneo.waitForDbEnv" -}}
+{{- $wait := .Values.postgres.wait -}}
+{{- $endpoints := list -}}
+{{- if and $wait.readOnlyService .Values.postgres.operatorManaged -}}
+{{- $endpoints = append $endpoints (printf "%s-postgres-ro/replica" (include "eneo.fullname" .)) -}}
+{{- end -}}
+{{- $endpoints = concat $endpoints ($wait.extraEndpoints | default list) -}}
+- name: WAIT_FOR_DB_DEADLINE
+  value: {{ $wait.deadlineSeconds | quote }}
+{{- if $endpoints }}
+- name: WAIT_FOR_DB_ENDPOINTS
+  value: {{ join "," $endpoints | quote }}
+- name: WAIT_FOR_DB_REQUIRE
+  value: {{ $wait.require | quote }}
+{{- end }}
+{{- if $wait.maxReplicaLagSeconds }}
+- name: WAIT_FOR_DB_MAX_LAG_SECONDS
+  value: {{ $wait.maxReplicaLagSeconds | quote }}
+{{- end }}
+{{- end -}}
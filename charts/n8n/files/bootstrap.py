@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+n8n bootstrap runner.
+
+Runs the first-run owner setup (setup.py) and the inference credential
+provisioning (inferens.py) as one dependency graph in a single process:
+
+    health -> owner -> login -> credentials
+    warmup (optional, checks the inference endpoints themselves)
+
+Without an owner email/password the owner and login steps are left out and
+the credentials are provisioned through the public API (N8N_API_KEY) once
+n8n is healthy.
+
+Every step starts as soon as the steps it depends on have succeeded, so
+independent steps run concurrently, and a step whose dependency failed is
+skipped instead of racing ahead (e.g. logging in before the owner exists).
+All steps share one readiness wait and one keep-alive, cookie-aware client
+(httpclient.py).
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import inferens
+import readiness
+import resilience
+import setup
+import telemetry
+import warmup
+
+WORKERS = int(os.getenv("BOOTSTRAP_WORKERS", "4"))
+HEALTH_DEADLINE = float(os.getenv("N8N_HEALTH_DEADLINE", "360"))
+
+metrics = telemetry.Recorder.from_env("n8n-bootstrap", "N8N")
+
+
+class Step:
+    """A named bootstrap step; func() failing means raising or returning False."""
+
+    def __init__(self, name, func, after=()):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+
+
+def run_steps(steps, workers=WORKERS):
+    """Run steps as a dependency graph. Returns {name: "ok" | "failed" | "skipped"}."""
+    names = {step.name for step in steps}
+    for step in steps:
+        unknown = [dep for dep in step.after if dep not in names]
+        if unknown:
+            raise ValueError(f"step '{step.name}' depends on unknown step(s) {', '.join(unknown)}")
+
+    status = {}
+    pending = {step.name: step for step in steps}
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name, step in list(pending.items()):
+                deps = [status.get(dep) for dep in step.after]
+                if any(dep in ("failed", "skipped") for dep in deps):
+                    print(f"BOOTSTRAP: Skipping {name}, a step it depends on did not succeed")
+                    status[name] = "skipped"
+                    del pending[name]
+                elif all(dep == "ok" for dep in deps):
+                    running[pool.submit(metrics.timed, name, step.func)] = name
+                    del pending[name]
+
+            if not running:
+                # Only a dependency cycle leaves steps that can never start
+                for name in pending:
+                    print(f"BOOTSTRAP: Skipping {name}, its dependencies form a cycle")
+                    status[name] = "skipped"
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    ok = future.result() is not False
+                except Exception as e:
+                    print(f"BOOTSTRAP: Step {name} failed: {e}")
+                    ok = False
+                status[name] = "ok" if ok else "failed"
+    return status
+
+
+def _health():
+    """Wait for n8n's healthz endpoint to return 200."""
+    url = f"{setup.N8N_URL}/healthz"
+    print(f"BOOTSTRAP: Waiting for n8n to be ready at {url}...")
+    if not readiness.wait_for_http(url, deadline=HEALTH_DEADLINE, prefix="BOOTSTRAP: "):
+        print("BOOTSTRAP: ERROR - n8n did not become ready in time")
+        return False
+    # The API call budgets start once n8n is up
+    setup.resilient.deadline = resilience.Deadline(setup.RUN_DEADLINE)
+    inferens.resilient.deadline = resilience.Deadline(inferens.RUN_DEADLINE)
+    return True
+
+
+def _owner():
+    """Ensure the owner account exists; fails if n8n's settings cannot be read."""
+    if not setup.show_setup_on_first_load():
+        print("SETUP: Initial setup already completed. Nothing to do.")
+        return True
+    return setup.create_owner()
+
+
+def _credentials_configured():
+    """Whether every desired credential has an API key (its own or INFERENS_API_KEY)."""
+    try:
+        inferens.desired_credentials()
+    except ValueError as e:
+        print(f"INFERENS: {e}")
+        return False
+    return True
+
+
+def build_steps(opener):
+    """The bootstrap graph for the configured features."""
+    has_owner = bool(setup.ADMIN_EMAIL and setup.ADMIN_PASSWORD)
+    steps = [Step("health", _health)]
+    if has_owner:
+        steps.append(Step("owner", _owner, after=["health"]))
+    else:
+        print("SETUP: No admin email/password configured, skipping owner setup.")
+
+    if not inferens.INFERENS_ENABLED:
+        print("INFERENS: Disabled, skipping.")
+    elif not has_owner and not inferens.N8N_API_KEY:
+        print("INFERENS: Missing required env vars: N8N_DEFAULT_USER_EMAIL/PASSWORD or N8N_API_KEY")
+    elif _credentials_configured():
+        if has_owner:
+            steps += [
+                Step("login", lambda: inferens.login(opener), after=["owner"]),
+                Step("credentials", lambda: inferens.ensure_inference_credentials(opener), after=["login"]),
+            ]
+        else:
+            steps.append(Step("credentials", lambda: inferens.ensure_inference_credentials(opener), after=["health"]))
+        if warmup.WARMUP_ENABLED:
+            # Talks to the inference endpoints, not n8n, so it does not wait for the n8n steps
+            steps.append(Step("warmup", warmup.warm_up_all))
+
+    if len(steps) == 1:
+        print("BOOTSTRAP: Nothing to set up.")
+        return []
+    return steps
+
+
+def main():
+    opener = inferens.build_opener()
+    # One session and one set of metrics for every step
+    setup.opener = opener
+    setup.metrics = inferens.metrics = warmup.metrics = metrics
+
+    status = run_steps(build_steps(opener))
+    if status:
+        summary = ", ".join(f"{name} {result}" for name, result in status.items())
+        print(f"BOOTSTRAP: {summary}")
+    metrics.flush()
+
+
+if __name__ == "__main__":
+    main()
+    print("BOOTSTRAP: Done. Sleeping.")
+    while True:
+        time.sleep(86400)
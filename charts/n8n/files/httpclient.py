@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Small HTTP client for the n8n bootstrap scripts, on the standard library.
+
+Client.open(req, timeout) takes a urllib.request.Request like an opener does
+and answers like one (HTTPError for status >= 400, a response usable as a
+context manager), but on http.client:
+
+- connections are kept alive and reused per host, across threads;
+- responses are requested with Accept-Encoding: gzip and decompressed
+  while they are read, capped at max_bytes after decompression;
+- text() decodes the body chunk by chunk instead of after reading it all;
+- the cookie jar (if any) is applied to every request and response.
+
+A reused connection the server has closed in the meantime is replaced and
+the request sent again once. Proxies from the environment are honoured
+(CONNECT for https). Redirects are not followed.
+"""
+
+import codecs
+import http.client
+import io
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+
+MAX_RESPONSE_BYTES = int(os.getenv("N8N_HTTP_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Errors of a request sent on a reused connection that the server had already closed
+_STALE_CONNECTION = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError,
+                     ConnectionResetError)
+
+
+class ResponseTooLarge(RuntimeError):
+    pass
+
+
+class Response:
+    """A response whose body is decompressed and size-checked as it is read."""
+
+    def __init__(self, client, key, conn, raw, url, max_bytes):
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.headers
+        self.url = url
+        self._client = client
+        self._key = key
+        self._conn = conn
+        self._raw = raw
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._done = False
+        encoding = raw.headers.get("Content-Encoding", "").lower()
+        if encoding == "gzip":
+            self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decoder = zlib.decompressobj()
+        else:
+            self._decoder = None
+
+    def info(self):
+        return self.headers
+
+    def _count(self, data):
+        self._size += len(data)
+        if self._size > self._max_bytes:
+            self._too_large()
+        return data
+
+    def _too_large(self):
+        self.close()
+        raise ResponseTooLarge(f"response from {self.url} exceeds {self._max_bytes} bytes")
+
+    def iter_chunks(self, size=64 * 1024):
+        """Yield the decoded body as it arrives; the connection is released at the end."""
+        while not self._done:
+            data = self._raw.read1(size)
+            if not data:
+                if self._decoder is not None:
+                    tail = self._count(self._decoder.flush())
+                    if tail:
+                        yield tail
+                self._finish()
+                return
+            if self._decoder is not None:
+                # Never inflate more than the limit allows, whatever the compression ratio
+                data = self._decoder.decompress(data, self._max_bytes - self._size + 1)
+                if self._decoder.unconsumed_tail:
+                    self._too_large()
+            if data:
+                yield self._count(data)
+
+    def read(self):
+        return b"".join(self.iter_chunks())
+
+    def text(self, encoding="utf-8"):
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        parts = [decoder.decode(chunk) for chunk in self.iter_chunks()]
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts)
+
+    def __iter__(self):
+        """Lines of the body as they arrive (e.g. server-sent events)."""
+        pending = b""
+        for chunk in self.iter_chunks():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                yield line + b"\n"
+        if pending:
+            yield pending
+
+    def _finish(self):
+        self._done = True
+        self._raw.close()
+        if self._raw.will_close:
+            self._conn.close()
+        else:
+            self._client._release(self._key, self._conn)
+
+    def close(self):
+        """Drop the connection if the body was not read to the end."""
+        if not self._done:
+            self._done = True
+            self._raw.close()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Client:
+    """Keep-alive HTTP client with an opener-like open(); safe to share between threads."""
+
+    def __init__(self, cookiejar=None, max_bytes=MAX_RESPONSE_BYTES, max_idle=4):
+        self.cookiejar = cookiejar
+        self.max_bytes = max_bytes
+        self.max_idle = max_idle
+        self._idle = {}  # (scheme, host, port) -> [idle connections]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _proxy(scheme, host):
+        """The proxy for scheme://host from the environment, as a split URL, or None."""
+        proxy = urllib.request.getproxies().get(scheme)
+        if not proxy or urllib.request.proxy_bypass(host):
+            return None
+        return urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+    def _new_connection(self, scheme, host, port, timeout):
+        proxy = self._proxy(scheme, host)
+        if scheme == "https":
+            import ssl
+
+            context = ssl.create_default_context()
+            if proxy is None:
+                return http.client.HTTPSConnection(host, port, timeout=timeout, context=context)
+            conn = http.client.HTTPSConnection(proxy.hostname, proxy.port or 80, timeout=timeout, context=context)
+            conn.set_tunnel(host, port)
+            return conn
+        if proxy is None:
+            return http.client.HTTPConnection(host, port, timeout=timeout)
+        return http.client.HTTPConnection(proxy.hostname, proxy.port or 80, timeout=timeout)
+
+    def _connection(self, key, timeout):
+        """An idle connection for key (reused=True) or a new one."""
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        return self._new_connection(*key, timeout), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            connections = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for conn in connections:
+            conn.close()
+
+    def open(self, req, timeout=None):
+        """Send req (a urllib.request.Request). Raises urllib.error.HTTPError for status >= 400."""
+        url = urllib.parse.urlsplit(req.full_url)
+        scheme = url.scheme.lower()
+        key = (scheme, url.hostname, url.port or (443 if scheme == "https" else 80))
+        if self.cookiejar is not None:
+            self.cookiejar.add_cookie_header(req)
+        headers = dict(req.header_items())
+        headers.setdefault("Accept-Encoding", "gzip")
+        # A plain-http proxy gets the absolute URL, a CONNECT tunnel the path
+        if scheme == "http" and self._proxy(scheme, url.hostname):
+            target = req.full_url
+        else:
+            target = (url.path or "/") + (f"?{url.query}" if url.query else "")
+
+        for attempt in range(2):
+            conn, reused = self._connection(key, timeout)
+            try:
+                conn.request(req.get_method(), target, body=req.data, headers=headers)
+                raw = conn.getresponse()
+            except _STALE_CONNECTION:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except http.client.HTTPException as e:
+                conn.close()
+                raise ConnectionError(f"{type(e).__name__}: {e}") from None
+            except BaseException:
+                conn.close()
+                raise
+            break
+
+        resp = Response(self, key, conn, raw, req.full_url, self.max_bytes)
+        if self.cookiejar is not None:
+            self.cookiejar.extract_cookies(resp, req)
+        if resp.status >= 400:
+            body = resp.read()
+            raise urllib.error.HTTPError(req.full_url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        return resp
@@ -1,17 +1,25 @@
 #!/usr/bin/env python3
 """
-n8n inference bootstrap script.
+n8n inference credential provisioning, run as steps of bootstrap.py.
 
-When enabled, this script logs into n8n as the owner user and ensures a shared
-OpenAI-compatible credential exists for the GDM inference endpoint.
+When enabled, the bootstrap logs into n8n as the owner user and ensures a shared
+OpenAI-compatible credential exists for the GDM inference endpoint (or one
+per entry of INFERENS_CREDENTIALS). Without an owner password it only uses
+the public API, authenticated with N8N_API_KEY.
 """
 
 import json
 import os
 import time
 import urllib.error
+import urllib.parse
 import urllib.request
-from http.cookiejar import CookieJar
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar, LoadError, MozillaCookieJar
+
+import httpclient
+import resilience
+import telemetry
 
 N8N_URL = os.getenv("N8N_URL", "http://localhost:5678")
 ADMIN_EMAIL = os.getenv("N8N_DEFAULT_USER_EMAIL", "")
@@ -22,35 +30,111 @@ INFERENS_API_KEY = os.getenv("INFERENS_API_KEY", "")
 INFERENS_ENDPOINT = os.getenv("INFERENS_ENDPOINT", "https://ai.gdm.se/api/v1")
 INFERENS_CREDENTIAL_NAME = os.getenv("INFERENS_CREDENTIAL_NAME", "GDM Inference")
 INFERENS_DEFAULT_MODEL = os.getenv("INFERENS_DEFAULT_MODEL", "")
+# Optional JSON list of credentials to provision instead of the single one above:
+# [{"name": ..., "endpoint": ..., "defaultModel": ..., "apiKeyEnv": ...}], where
+# endpoint, defaultModel and the API key (read from the env var apiKeyEnv names)
+# default to INFERENS_ENDPOINT, INFERENS_DEFAULT_MODEL and INFERENS_API_KEY
+INFERENS_CREDENTIALS = os.getenv("INFERENS_CREDENTIALS", "")
+# Creates/updates in flight at once
+INFERENS_WORKERS = int(os.getenv("INFERENS_WORKERS", "4"))
+
+# Budget for the API calls after n8n is healthy, and retries of transient failures
+RUN_DEADLINE = float(os.getenv("INFERENS_RUN_DEADLINE", "300"))
+HTTP_RETRIES = int(os.getenv("N8N_HTTP_RETRIES", "3"))
+
+# n8n's internal REST API first, the public API when an endpoint is not served there
+API_PREFIXES = ("/rest", "/api/v1")
+# The public API authenticates with an API key instead of the login session
+N8N_API_KEY = os.getenv("N8N_API_KEY", "")
+# Where the detected API flavor is kept between restarts, per n8n version ("" = memory only)
+STATE_DIR = os.getenv("N8N_BOOTSTRAP_STATE_DIR", "")
+API_FLAVOR_FILE = "api-flavor.json"
+# The n8n session cookie, reused across restarts until it expires
+SESSION_FILE = "session-cookies.txt"
+
+metrics = telemetry.Recorder.from_env("n8n-inferens", "N8N")
+
+resilient = resilience.Resilience(
+    resilience.EndpointTimeouts(default=20, rules=[("POST", r"^/rest/login$", 15), ("GET", r"", 10)]),
+    policy=resilience.RetryPolicy(HTTP_RETRIES),
+    breaker=resilience.CircuitBreaker(name="n8n API", prefix="INFERENS: "),
+    prefix="INFERENS: ",
+)
+
+# {"version": n8n version, "prefix": credentials API prefix, "auth": "session" | "api-key"}
+_api_flavor = {}
+
+
+def build_opener():
+    """A keep-alive client with a cookie jar; the jar is loaded from STATE_DIR when a session was saved there."""
+    if not STATE_DIR:
+        return httpclient.Client(CookieJar())
+
+    cj = MozillaCookieJar(os.path.join(STATE_DIR, SESSION_FILE))
+    try:
+        cj.load(ignore_discard=True)
+    except FileNotFoundError:
+        pass
+    except (OSError, LoadError) as e:
+        print(f"INFERENS: Ignoring saved session {cj.filename}: {e}")
+    return httpclient.Client(cj)
+
+
+def _session_saved(opener):
+    """Whether the session file holds exactly the opener's cookies."""
+    cj = opener.cookiejar
+    saved = MozillaCookieJar()
+    try:
+        saved.load(cj.filename, ignore_discard=True)
+    except (OSError, LoadError):
+        return False
+    return {(c.domain, c.path, c.name, c.value) for c in saved} == {(c.domain, c.path, c.name, c.value) for c in cj}
 
 
-def wait_for_health():
-    """Wait for n8n healthz endpoint to return 200."""
-    url = f"{N8N_URL}/healthz"
-    print(f"INFERENS: Waiting for n8n to be ready at {url}...")
+def _save_session(opener):
+    """Write the session cookies for the next start, readable by this user only."""
+    cj = opener.cookiejar
+    if not isinstance(cj, MozillaCookieJar):
+        return
+    tmp = f"{cj.filename}.tmp"
+    try:
+        os.close(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600))
+        cj.save(tmp, ignore_discard=True)
+        os.replace(tmp, cj.filename)
+    except OSError as e:
+        print(f"INFERENS: Could not save the session to {cj.filename}: {e}")
 
-    for attempt in range(1, 121):
-        try:
-            req = urllib.request.Request(url)
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                if resp.status == 200:
-                    print("INFERENS: n8n is ready!")
-                    return True
-        except Exception:
-            pass
-        print(f"INFERENS: Attempt {attempt}/120 - waiting...")
-        time.sleep(3)
-
-    print("INFERENS: ERROR - n8n did not become ready in time")
-    return False
 
+def _open(opener, req, timeout, retries=0):
+    """Open req and record the call's latency and status."""
+    started = time.monotonic()
+    path = urllib.parse.urlsplit(req.full_url).path
+    try:
+        resp = opener.open(req, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        metrics.record_call(req.get_method(), path, e.code, time.monotonic() - started, retries)
+        raise
+    except Exception as e:
+        metrics.record_call(req.get_method(), path, type(e).__name__, time.monotonic() - started, retries)
+        raise
+    metrics.record_call(req.get_method(), path, resp.status, time.monotonic() - started, retries)
+    return resp
 
-def _build_opener():
-    cj = CookieJar()
-    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cj))
 
+def _classify(result, error):
+    if isinstance(error, urllib.error.HTTPError):
+        return resilience.classify_status(error.code)
+    if isinstance(error, OSError):
+        return resilience.UNAVAILABLE
+    return resilience.OK
 
-def _request_json(opener, method, path, payload=None, extra_headers=None):
+
+def _request_json(opener, method, path, payload=None, extra_headers=None, recheck=None):
+    """Send a JSON request to n8n and return the decoded response.
+
+    Transient failures are retried for idempotent methods, and for a POST
+    once recheck() returned None (see resilience.Resilience.call).
+    """
     body = None
     headers = {
         "Accept": "application/json",
@@ -61,22 +145,164 @@ def _request_json(opener, method, path, payload=None, extra_headers=None):
     if extra_headers:
         headers.update(extra_headers)
 
-    req = urllib.request.Request(
-        f"{N8N_URL}{path}",
-        data=body,
-        headers=headers,
-        method=method,
-    )
+    attempts = 0
+
+    def send(timeout):
+        nonlocal attempts
+        attempts += 1
+        req = urllib.request.Request(
+            f"{N8N_URL}{path}",
+            data=body,
+            headers=headers,
+            method=method,
+        )
+        with _open(opener, req, timeout, retries=int(attempts > 1)) as resp:
+            raw = resp.text()
+            if not raw.strip():
+                return {}
+            return json.loads(raw)
+
+    return resilient.call(method, path, send, _classify, recheck=recheck)
+
+
+def n8n_version(opener):
+    """The running n8n's version from the unauthenticated settings endpoint ("" if unknown)."""
+    try:
+        data = _request_json(opener, "GET", "/rest/settings")
+    except Exception as e:
+        print(f"INFERENS: Could not read the n8n version: {e}")
+        return ""
+    return (data.get("data") or {}).get("versionCli", "")
+
+
+def _flavor_path():
+    return os.path.join(STATE_DIR, API_FLAVOR_FILE) if STATE_DIR else ""
+
+
+def api_flavor(opener):
+    """The credentials API flavor, detected once per process.
+
+    A flavor cached for the running n8n version is used as is; a cache
+    written by another version is ignored and replaced once the flavor
+    has been detected again.
+    """
+    if "version" in _api_flavor:
+        return _api_flavor
+    version = n8n_version(opener)
+    _api_flavor["version"] = version
+    path = _flavor_path()
+    if not version or not path:
+        return _api_flavor
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return _api_flavor
+    if cached.get("version") == version and cached.get("prefix") in _api_prefixes():
+        _api_flavor.update(prefix=cached["prefix"], auth=cached.get("auth", "session"))
+        print(f"INFERENS: Using the {cached['prefix']} credentials API (cached for n8n {version})")
+    else:
+        print(f"INFERENS: API flavor cache is for n8n {cached.get('version')}, running {version}; detecting again")
+    return _api_flavor
+
+
+def _api_prefixes():
+    """The credentials APIs this configuration can authenticate against: /rest needs the owner login."""
+    if ADMIN_EMAIL and ADMIN_PASSWORD:
+        return API_PREFIXES
+    return API_PREFIXES[1:] if N8N_API_KEY else ()
+
+
+def _auth_for(prefix):
+    return "api-key" if prefix != API_PREFIXES[0] and N8N_API_KEY else "session"
+
+
+def _auth_headers(auth):
+    return {"X-N8N-API-KEY": N8N_API_KEY} if auth == "api-key" else None
+
+
+def _remember_flavor(prefix):
+    if _api_flavor.get("prefix") == prefix:
+        return
+    _api_flavor.update(prefix=prefix, auth=_auth_for(prefix))
+    path = _flavor_path()
+    if not path or not _api_flavor.get("version"):
+        return
+    try:
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(_api_flavor, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        print(f"INFERENS: Could not write {path}: {e}")
+
+
+def _with_api_fallback(opener, call, suffix=""):
+    """Run call(path, headers) against the credentials API n8n serves.
+
+    The flavor from api_flavor() is tried alone. Without one (or when it
+    stopped answering with 404/405), /rest is tried before /api/v1 (only
+    /api/v1 without an owner login) and the first that serves the endpoint
+    is remembered.
+    """
+    flavor = api_flavor(opener)
+    known = flavor.get("prefix")
+    if known:
+        try:
+            return call(f"{known}/credentials{suffix}", _auth_headers(flavor["auth"]))
+        except urllib.error.HTTPError as e:
+            if e.code not in (404, 405):
+                raise
+            print(f"INFERENS: {known}/credentials{suffix} no longer available ({e.code}), detecting the API again")
+            flavor.pop("prefix")
+
+    candidates = [prefix for prefix in _api_prefixes() if prefix != known]
+    for prefix in candidates:
+        try:
+            result = call(f"{prefix}/credentials{suffix}", _auth_headers(_auth_for(prefix)))
+        except urllib.error.HTTPError as e:
+            if e.code not in (404, 405) or prefix == candidates[-1]:
+                raise
+            print(f"INFERENS: {prefix}/credentials{suffix} not available ({e.code}), trying the next API")
+            continue
+        _remember_flavor(prefix)
+        return result
 
-    with opener.open(req, timeout=20) as resp:
-        raw = resp.read().decode()
-        if not raw.strip():
-            return {}
-        return json.loads(raw)
+
+def _http_error(e):
+    body = e.read().decode(errors="ignore")
+    return RuntimeError(f"status={e.code} body={body}")
+
+
+def session_valid(opener):
+    """Whether the opener's cookies still authenticate: GET /rest/login returns the current user."""
+    if not len(opener.cookiejar):
+        return False
+    try:
+        _request_json(opener, "GET", "/rest/login")
+        return True
+    except urllib.error.HTTPError as e:
+        if e.code not in (401, 403):
+            print(f"INFERENS: Could not check the saved session ({e.code})")
+    except Exception as e:
+        print(f"INFERENS: Could not check the saved session: {e}")
+    opener.cookiejar.clear()
+    return False
 
 
 def login(opener):
-    """Authenticate against n8n REST API and keep session cookies."""
+    """Authenticate against n8n REST API and keep session cookies.
+
+    A valid session is reused, whether saved by an earlier start or set
+    by the owner setup of this one, and saved if the session file does not
+    hold it yet, so restarts do not each cost n8n a password hash and a
+    rate-limited login.
+    """
+    if session_valid(opener):
+        print("INFERENS: Session still valid, not logging in again")
+        if isinstance(opener.cookiejar, MozillaCookieJar) and not _session_saved(opener):
+            _save_session(opener)
+        return True
+
     payload = {
         "emailOrLdapLoginId": ADMIN_EMAIL,
         "password": ADMIN_PASSWORD,
@@ -84,6 +310,7 @@ def login(opener):
     try:
         _request_json(opener, "POST", "/rest/login", payload)
         print("INFERENS: Logged in successfully")
+        _save_session(opener)
         return True
     except urllib.error.HTTPError as e:
         body = e.read().decode(errors="ignore")
@@ -95,105 +322,119 @@ def login(opener):
 
 
 def list_credentials(opener):
-    for path in ["/rest/credentials", "/api/v1/credentials"]:
-        try:
-            response = _request_json(opener, "GET", path)
-            if isinstance(response, dict) and "data" in response:
-                return response.get("data", [])
-            if isinstance(response, list):
-                return response
-        except Exception:
-            continue
+    response = _with_api_fallback(opener, lambda path, headers: _request_json(opener, "GET", path,
+                                                                             extra_headers=headers))
+    if isinstance(response, dict) and "data" in response:
+        return response.get("data", [])
+    if isinstance(response, list):
+        return response
     return []
 
 
+def _find_credential(opener, name):
+    return next((c for c in list_credentials(opener) if c.get("name") == name), None)
+
+
 def create_credential(opener, payload):
-    last_error = None
-    for path in ["/rest/credentials", "/api/v1/credentials"]:
-        try:
-            return _request_json(opener, "POST", path, payload)
-        except urllib.error.HTTPError as e:
-            body = e.read().decode(errors="ignore")
-            last_error = f"status={e.code} body={body}"
-        except Exception as e:
-            last_error = str(e)
-    raise RuntimeError(last_error or "unable to create credential")
+    """Create a credential; a failed attempt is only repeated if no credential of that name exists."""
+    def recheck():
+        existing = _find_credential(opener, payload["name"])
+        return None if existing is None else {"data": existing}
 
+    try:
+        return _with_api_fallback(opener, lambda path, headers: _request_json(opener, "POST", path, payload,
+                                                                              headers, recheck=recheck))
+    except urllib.error.HTTPError as e:
+        raise _http_error(e) from None
 
-def update_credential(opener, credential_id, payload):
-    last_error = None
-    for path in [f"/rest/credentials/{credential_id}", f"/api/v1/credentials/{credential_id}"]:
-        try:
-            return _request_json(opener, "PATCH", path, payload)
-        except urllib.error.HTTPError as e:
-            body = e.read().decode(errors="ignore")
-            last_error = f"status={e.code} body={body}"
-        except Exception as e:
-            last_error = str(e)
-    raise RuntimeError(last_error or "unable to update credential")
 
+def update_credential(opener, credential_id, payload):
+    try:
+        return _with_api_fallback(opener, lambda path, headers: _request_json(opener, "PATCH", path, payload, headers),
+                                  f"/{credential_id}")
+    except urllib.error.HTTPError as e:
+        raise _http_error(e) from None
 
-def ensure_inference_credential(opener):
-    credentials = list_credentials(opener)
-    existing = next((c for c in credentials if c.get("name") == INFERENS_CREDENTIAL_NAME), None)
 
-    base_payload = {
-        "name": INFERENS_CREDENTIAL_NAME,
+def credential_payload(name, endpoint, api_key, model=""):
+    payload = {
+        "name": name,
         "type": "openAiApi",
         "data": {
-            "apiKey": INFERENS_API_KEY,
-            "url": INFERENS_ENDPOINT,
-            "baseUrl": INFERENS_ENDPOINT,
+            "apiKey": api_key,
+            "url": endpoint,
+            "baseUrl": endpoint,
         },
     }
 
-    if INFERENS_DEFAULT_MODEL:
-        base_payload["data"]["model"] = INFERENS_DEFAULT_MODEL
-
+    if model:
+        payload["data"]["model"] = model
+    return payload
+
+
+def desired_credentials():
+    """The credential payloads to provision, from INFERENS_CREDENTIALS or the single-credential env vars.
+
+    INFERENS_API_KEY is only needed by credentials without a key of their
+    own; a credential left without any key raises ValueError.
+    """
+    if not INFERENS_CREDENTIALS.strip():
+        if not INFERENS_API_KEY:
+            raise ValueError(f"No API key for credential '{INFERENS_CREDENTIAL_NAME}' (INFERENS_API_KEY)")
+        return [credential_payload(INFERENS_CREDENTIAL_NAME, INFERENS_ENDPOINT, INFERENS_API_KEY,
+                                   INFERENS_DEFAULT_MODEL)]
+
+    payloads = []
+    for entry in json.loads(INFERENS_CREDENTIALS):
+        name = entry.get("name")
+        if not name:
+            raise ValueError(f"INFERENS_CREDENTIALS entry without a name: {entry}")
+        if any(p["name"] == name for p in payloads):
+            raise ValueError(f"INFERENS_CREDENTIALS names '{name}' twice")
+        api_key = os.getenv(entry["apiKeyEnv"], "") if entry.get("apiKeyEnv") else INFERENS_API_KEY
+        if not api_key:
+            raise ValueError(f"No API key for credential '{name}' ({entry.get('apiKeyEnv') or 'INFERENS_API_KEY'})")
+        payloads.append(credential_payload(name, entry.get("endpoint") or INFERENS_ENDPOINT, api_key,
+                                           entry.get("defaultModel") or INFERENS_DEFAULT_MODEL))
+    return payloads
+
+
+def apply_credential(opener, payload, existing=None):
+    """Update existing (from the credential snapshot) to payload, or create the credential."""
+    name = payload["name"]
     if existing:
         credential_id = existing.get("id")
-        print(f"INFERENS: Updating credential '{INFERENS_CREDENTIAL_NAME}' (id={credential_id})")
-        result = update_credential(opener, credential_id, base_payload)
-        print(f"INFERENS: Updated credential: {json.dumps(result)}")
-        return
-
-    print(f"INFERENS: Creating credential '{INFERENS_CREDENTIAL_NAME}'")
-    result = create_credential(opener, base_payload)
-    print(f"INFERENS: Created credential: {json.dumps(result)}")
-
-
-def run():
-    if not INFERENS_ENABLED:
-        print("INFERENS: Disabled, skipping.")
+        print(f"INFERENS: Updating credential '{name}' (id={credential_id})")
+        update_credential(opener, credential_id, payload)
+        print(f"INFERENS: Updated credential '{name}'")
         return
 
-    missing = []
-    if not ADMIN_EMAIL:
-        missing.append("N8N_DEFAULT_USER_EMAIL")
-    if not ADMIN_PASSWORD:
-        missing.append("N8N_DEFAULT_USER_PASSWORD")
-    if not INFERENS_API_KEY:
-        missing.append("INFERENS_API_KEY")
+    print(f"INFERENS: Creating credential '{name}'")
+    result = create_credential(opener, payload)
+    created = result.get("data", result) if isinstance(result, dict) else {}
+    print(f"INFERENS: Created credential '{name}' (id={created.get('id', 'unknown')})")
 
-    if missing:
-        print(f"INFERENS: Missing required env vars: {', '.join(missing)}")
-        return
-
-    if not wait_for_health():
-        return
 
-    opener = _build_opener()
-    if not login(opener):
-        return
+def ensure_inference_credentials(opener):
+    """Reconcile every desired credential against one snapshot of n8n's credentials.
 
-    try:
-        ensure_inference_credential(opener)
-    except Exception as e:
-        print(f"INFERENS: Failed to ensure credential: {e}")
+    Creates and updates run on up to INFERENS_WORKERS threads sharing the
+    logged-in opener. Returns False if any credential failed.
+    """
+    desired = desired_credentials()
+    snapshot = {c.get("name"): c for c in list_credentials(opener)}
 
+    with ThreadPoolExecutor(max_workers=max(1, min(INFERENS_WORKERS, len(desired)))) as pool:
+        futures = {payload["name"]: pool.submit(apply_credential, opener, payload, snapshot.get(payload["name"]))
+                   for payload in desired}
 
-if __name__ == "__main__":
-    run()
-    print("INFERENS: Done. Sleeping.")
-    while True:
-        time.sleep(86400)
\ No newline at end of file
+    failed = []
+    for name, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            print(f"INFERENS: Failed to ensure credential '{name}': {e}")
+            failed.append(name)
+    if len(desired) > 1:
+        print(f"INFERENS: {len(desired) - len(failed)}/{len(desired)} credentials provisioned")
+    return not failed
@@ -1,114 +1,117 @@
 #!/usr/bin/env python3
 """
-n8n first-run setup script.
-Waits for n8n to become ready, then checks if initial owner setup is needed.
-If showSetupOnFirstLoad is true, creates the first admin user.
+n8n first-run owner setup, run as a step of bootstrap.py.
+Checks whether n8n still shows its setup on first load and, if it does,
+creates the first admin user.
 """
 
 import json
 import os
 import time
+import urllib.parse
 import urllib.request
 import urllib.error
 
+import httpclient
+import resilience
+import telemetry
+
 N8N_URL = os.getenv("N8N_URL", "http://localhost:5678")
 ADMIN_EMAIL = os.getenv("N8N_DEFAULT_USER_EMAIL", "")
 ADMIN_PASSWORD = os.getenv("N8N_DEFAULT_USER_PASSWORD", "")
 
+# Budget for the API calls after n8n is healthy, and retries of transient failures
+# (n8n may answer /rest/settings with an empty body for a while after startup)
+RUN_DEADLINE = float(os.getenv("SETUP_RUN_DEADLINE", "120"))
+HTTP_RETRIES = int(os.getenv("SETUP_HTTP_RETRIES", "8"))
 
-def wait_for_health():
-    """Wait for n8n healthz endpoint to return 200."""
-    url = f"{N8N_URL}/healthz"
-    print(f"SETUP: Waiting for n8n to be ready at {url}...")
-
-    for attempt in range(1, 121):
-        try:
-            req = urllib.request.Request(url)
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                if resp.status == 200:
-                    print("SETUP: n8n is ready!")
-                    return True
-        except Exception as e:
-            pass
-        print(f"SETUP: Attempt {attempt}/120 - waiting...")
-        time.sleep(3)
-
-    print("SETUP: ERROR - n8n did not become ready in time")
-    return False
+metrics = telemetry.Recorder.from_env("n8n-setup", "N8N")
 
+# Replaced by bootstrap.py with the opener it shares between all steps
+opener = httpclient.Client()
 
-def check_setup_needed():
-    """Check /rest/settings to see if first-run setup is required."""
-    url = f"{N8N_URL}/rest/settings"
-    for attempt in range(1, 31):
-        try:
-            req = urllib.request.Request(url)
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                raw = resp.read().decode()
-                if not raw.strip():
-                    print(f"SETUP: Settings returned empty response (attempt {attempt}/30), retrying...")
-                    time.sleep(3)
-                    continue
-                data = json.loads(raw)
-                show_setup = (
-                    data.get("data", {})
-                    .get("userManagement", {})
-                    .get("showSetupOnFirstLoad", False)
-                )
-                print(f"SETUP: showSetupOnFirstLoad = {show_setup}")
-                return show_setup
-        except json.JSONDecodeError as e:
-            print(f"SETUP: Settings returned invalid JSON (attempt {attempt}/30): {e}")
-            print(f"SETUP: Raw response: {raw[:500] if raw else '(empty)'}")
-            time.sleep(3)
-        except Exception as e:
-            print(f"SETUP: Could not fetch settings (attempt {attempt}/30): {e}")
-            time.sleep(3)
-
-    print("SETUP: Failed to fetch settings after 30 attempts")
-    return False
+resilient = resilience.Resilience(
+    resilience.EndpointTimeouts(default=10),
+    policy=resilience.RetryPolicy(HTTP_RETRIES),
+    breaker=resilience.CircuitBreaker(name="n8n API", prefix="SETUP: "),
+    prefix="SETUP: ",
+)
+
+
+def _open(req, timeout, retries=0):
+    """Open req and record the call's latency and status."""
+    started = time.monotonic()
+    path = urllib.parse.urlsplit(req.full_url).path
+    try:
+        resp = opener.open(req, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        metrics.record_call(req.get_method(), path, e.code, time.monotonic() - started, retries)
+        raise
+    except Exception as e:
+        metrics.record_call(req.get_method(), path, type(e).__name__, time.monotonic() - started, retries)
+        raise
+    metrics.record_call(req.get_method(), path, resp.status, time.monotonic() - started, retries)
+    return resp
+
+
+def _classify(result, error):
+    if isinstance(error, urllib.error.HTTPError):
+        return resilience.classify_status(error.code)
+    if isinstance(error, OSError):
+        return resilience.UNAVAILABLE
+    if isinstance(error, ValueError):
+        # Empty or truncated JSON while n8n is still starting
+        return resilience.RETRY
+    return resilience.OK
+
+
+def _request_json(method, path, payload=None, recheck=None):
+    """Send a JSON request to n8n with retries and return the decoded response."""
+    body = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Accept": "application/json"}
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+    attempts = 0
+
+    def send(timeout):
+        nonlocal attempts
+        attempts += 1
+        req = urllib.request.Request(f"{N8N_URL}{path}", data=body, headers=headers, method=method)
+        with _open(req, timeout, retries=int(attempts > 1)) as resp:
+            raw = resp.text()
+        if not raw.strip():
+            raise ValueError(f"empty response from {path}")
+        return json.loads(raw)
+
+    return resilient.call(method, path, send, _classify, recheck=recheck)
+
+
+def show_setup_on_first_load():
+    data = _request_json("GET", "/rest/settings")
+    return data.get("data", {}).get("userManagement", {}).get("showSetupOnFirstLoad", False)
 
 
 def create_owner():
-    """Create the first owner account via /rest/owner/setup."""
-    url = f"{N8N_URL}/rest/owner/setup"
-    payload = json.dumps({
+    """Create the first owner account via /rest/owner/setup.
+
+    A failed attempt is only repeated while n8n still asks for first-run
+    setup, so the owner is never created twice. Returns True once the
+    owner exists.
+    """
+    payload = {
         "email": ADMIN_EMAIL,
         "firstName": "Admin",
         "lastName": "User",
         "password": ADMIN_PASSWORD,
-    }).encode()
-
-    req = urllib.request.Request(
-        url,
-        data=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        },
-    )
-
+    }
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            result = json.loads(resp.read().decode())
-            print(f"SETUP: Owner account created successfully! (id={result.get('data', {}).get('id', 'unknown')})")
+        result = _request_json("POST", "/rest/owner/setup", payload,
+                               recheck=lambda: None if show_setup_on_first_load() else {})
+        print(f"SETUP: Owner account created successfully! (id={result.get('data', {}).get('id', 'unknown')})")
+        return True
     except urllib.error.HTTPError as e:
         body = e.read().decode()
         print(f"SETUP: Owner setup failed ({e.code}): {body}")
     except Exception as e:
         print(f"SETUP: Owner setup error: {e}")
-
-
-if __name__ == "__main__":
-    if not ADMIN_EMAIL or not ADMIN_PASSWORD:
-        print("SETUP: No admin email/password configured, skipping setup.")
-    elif not wait_for_health():
-        print("SETUP: Aborting - n8n not ready.")
-    elif not check_setup_needed():
-        print("SETUP: Initial setup already completed. Nothing to do.")
-    else:
-        create_owner()
-
-    print("SETUP: Done. Sleeping.")
-    while True:
-        time.sleep(86400)
+    return False
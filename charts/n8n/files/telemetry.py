@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Timing instrumentation shared by the chart bootstrap scripts.
+
+A Recorder collects per-endpoint HTTP latency, status codes and retry
+counts plus the duration of named phases (health wait, login, ...). Every
+observation can be emitted as a structured JSON log line, and the
+aggregates are rendered in the Prometheus text format, either to a file
+(for a textfile collector or a later scrape) or on a small /metrics HTTP
+endpoint for long-lived sidecars. Only the standard library is used.
+
+The n8n chart ships a copy of this module; edit this one and run
+tools/sync_shared_modules.py.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+_ID_SEGMENT = re.compile(
+    r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)(?=/|$)"
+)
+
+
+def endpoint_template(path):
+    """Collapse IDs in a URL path so that metrics are grouped per endpoint."""
+    return _ID_SEGMENT.sub("/{id}", path.split("?", 1)[0])
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Recorder:
+    """Thread-safe collector of HTTP call and phase timings for one service."""
+
+    def __init__(self, service, json_logs=True, metrics_file="", metrics_port=0):
+        self.service = service
+        self.json_logs = json_logs
+        self.metrics_file = metrics_file
+        self.metrics_port = metrics_port
+        self._lock = threading.Lock()
+        self._calls = {}   # (method, endpoint, status) -> count
+        self._latency = {}  # (method, endpoint) -> [count, sum, max]
+        self._retries = {}  # (method, endpoint) -> count
+        self._phases = {}   # phase -> (seconds, ok)
+        self._gauges = {}   # name -> (value, help)
+        self._server = None
+
+    @classmethod
+    def from_env(cls, service, prefix):
+        """Build a recorder configured by <prefix>_JSON_LOGS, _METRICS_FILE and _METRICS_PORT."""
+        return cls(
+            service,
+            json_logs=os.getenv(f"{prefix}_JSON_LOGS", "true").lower() == "true",
+            metrics_file=os.getenv(f"{prefix}_METRICS_FILE", ""),
+            metrics_port=int(os.getenv(f"{prefix}_METRICS_PORT", "0") or 0),
+        )
+
+    def _emit(self, event, **fields):
+        if self.json_logs:
+            print(json.dumps({"event": event, "service": self.service, **fields}), flush=True)
+
+    def record_call(self, method, path, status, seconds, retries=0):
+        """Record one HTTP call. status is the response code or an error class name."""
+        endpoint = endpoint_template(path)
+        with self._lock:
+            key = (method, endpoint, str(status))
+            self._calls[key] = self._calls.get(key, 0) + 1
+            stats = self._latency.setdefault((method, endpoint), [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            if retries:
+                self._retries[(method, endpoint)] = self._retries.get((method, endpoint), 0) + retries
+        self._emit("http", method=method, endpoint=endpoint, status=status,
+                   ms=round(seconds * 1000, 1), retries=retries)
+
+    def record_phase(self, name, seconds, ok=True):
+        with self._lock:
+            self._phases[name] = (seconds, ok)
+        self._emit("phase", phase=name, seconds=round(seconds, 3), ok=ok)
+
+    def set_gauge(self, name, value, help=""):
+        """Record a value (bytes freed, entries evicted, ...) exported as bootstrap_<name>."""
+        with self._lock:
+            self._gauges[name] = (value, help)
+        self._emit("gauge", name=name, value=value)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as a named phase; an exception marks it failed."""
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record_phase(name, time.monotonic() - started, ok)
+
+    def timed(self, name, func, *args):
+        """Call func as a named phase; an exception or a False result marks it failed."""
+        started = time.monotonic()
+        ok = False
+        try:
+            result = func(*args)
+            ok = result is not False
+            return result
+        finally:
+            self.record_phase(name, time.monotonic() - started, ok)
+
+    def render(self):
+        """Return the collected metrics in the Prometheus text exposition format."""
+        service = self.service
+        lines = []
+        with self._lock:
+            lines.append("# HELP bootstrap_http_requests_total HTTP calls made by the bootstrap script.")
+            lines.append("# TYPE bootstrap_http_requests_total counter")
+            for (method, endpoint, status), count in sorted(self._calls.items()):
+                labels = _labels(service=service, method=method, endpoint=endpoint, status=status)
+                lines.append(f"bootstrap_http_requests_total{labels} {count}")
+
+            lines.append("# HELP bootstrap_http_request_duration_seconds HTTP call latency.")
+            lines.append("# TYPE bootstrap_http_request_duration_seconds summary")
+            for (method, endpoint), (count, total, _) in sorted(self._latency.items()):
+                labels = _labels(service=service, method=method, endpoint=endpoint)
+                lines.append(f"bootstrap_http_request_duration_seconds_sum{labels} {total:.6f}")
+                lines.append(f"bootstrap_http_request_duration_seconds_count{labels} {count}")
+
+            lines.append("# HELP bootstrap_http_request_duration_max_seconds Slowest HTTP call per endpoint.")
+            lines.append("# TYPE bootstrap_http_request_duration_max_seconds gauge")
+            for (method, endpoint), (_, _, slowest) in sorted(self._latency.items()):
+                labels = _labels(service=service, method=method, endpoint=endpoint)
+                lines.append(f"bootstrap_http_request_duration_max_seconds{labels} {slowest:.6f}")
+
+            lines.append("# HELP bootstrap_http_retries_total Retried HTTP calls.")
+            lines.append("# TYPE bootstrap_http_retries_total counter")
+            for (method, endpoint), count in sorted(self._retries.items()):
+                labels = _labels(service=service, method=method, endpoint=endpoint)
+                lines.append(f"bootstrap_http_retries_total{labels} {count}")
+
+            lines.append("# HELP bootstrap_phase_duration_seconds Duration of the last run of each phase.")
+            lines.append("# TYPE bootstrap_phase_duration_seconds gauge")
+            for name, (seconds, _) in sorted(self._phases.items()):
+                lines.append(f"bootstrap_phase_duration_seconds{_labels(service=service, phase=name)} {seconds:.6f}")
+
+            lines.append("# HELP bootstrap_phase_success Whether the last run of each phase succeeded.")
+            lines.append("# TYPE bootstrap_phase_success gauge")
+            for name, (_, ok) in sorted(self._phases.items()):
+                lines.append(f"bootstrap_phase_success{_labels(service=service, phase=name)} {int(ok)}")
+
+            for name, (value, help) in sorted(self._gauges.items()):
+                if help:
+                    lines.append(f"# HELP bootstrap_{name} {help}")
+                lines.append(f"# TYPE bootstrap_{name} gauge")
+                lines.append(f"bootstrap_{name}{_labels(service=service)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Atomically write the metrics file, if one is configured."""
+        if not self.metrics_file:
+            return
+        tmp_path = f"{self.metrics_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.metrics_file)
+        except OSError as e:
+            print(f"Could not write metrics to {self.metrics_file}: {e}")
+
+    def serve(self):
+        """Serve /metrics on the configured port from a daemon thread (no-op if port is 0)."""
+        if not self.metrics_port or self._server is not None:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("", self.metrics_port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on :{self.metrics_port}/metrics")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+n8n inference warm-up.
+
+Checks the endpoint behind every inference credential the way a workflow
+will use it: lists <endpoint>/models with the credential's API key, then
+streams a one-token chat completion against the credential's default model,
+recording the time to first token and the total latency. A rejected key, a
+model the endpoint does not serve or a failing completion fails the step
+with the endpoint's own error, instead of surfacing in the first workflow
+run, and the calls pay DNS, TLS and model loading before users do.
+
+The model list of each credential is cached in the bootstrap state
+directory (models.json). Run it directly to check an endpoint, e.g. against
+bench/stub_openai.py; the exit status is 1 if a credential failed.
+"""
+
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import httpclient
+import inferens
+import telemetry
+
+WARMUP_ENABLED = os.getenv("INFERENS_WARMUP", "false").lower() == "true"
+WARMUP_TIMEOUT = float(os.getenv("INFERENS_WARMUP_TIMEOUT", "60"))
+MODELS_CACHE_FILE = "models.json"
+
+metrics = telemetry.Recorder.from_env("n8n-warmup", "N8N")
+
+# Keeps the TLS connection to each endpoint open between the calls
+client = httpclient.Client()
+
+
+def _open(method, url, api_key, payload=None):
+    """Send one request to the inference endpoint and record its latency and status."""
+    data = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Authorization": f"Bearer {api_key}", "Accept": "application/json"}
+    if data is not None:
+        headers["Content-Type"] = "application/json"
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    path = urllib.parse.urlsplit(url).path
+    started = time.monotonic()
+    try:
+        resp = client.open(req, timeout=WARMUP_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        metrics.record_call(method, path, e.code, time.monotonic() - started)
+        raise _endpoint_error(e) from None
+    except Exception as e:
+        metrics.record_call(method, path, type(e).__name__, time.monotonic() - started)
+        raise
+    metrics.record_call(method, path, resp.status, time.monotonic() - started)
+    return resp
+
+
+def _endpoint_error(e):
+    """A RuntimeError carrying the endpoint's own message (OpenAI error bodies)."""
+    body = e.read().decode(errors="ignore")
+    try:
+        message = json.loads(body).get("error", {}).get("message") or body
+    except (ValueError, AttributeError):
+        message = body
+    if e.code in (401, 403):
+        return RuntimeError(f"API key rejected ({e.code}): {message}")
+    return RuntimeError(f"status={e.code}: {message}")
+
+
+def list_models(endpoint, api_key):
+    with _open("GET", f"{endpoint.rstrip('/')}/models", api_key) as resp:
+        body = json.loads(resp.text() or "{}")
+    return sorted(model.get("id") for model in body.get("data", []) if model.get("id"))
+
+
+def first_token(endpoint, api_key, model):
+    """Stream a one-token completion. Returns (seconds to first token, total seconds)."""
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": "ping"}],
+        "max_tokens": 1,
+        "temperature": 0,
+        "stream": True,
+    }
+    started = time.monotonic()
+    ttft = None
+    with _open("POST", f"{endpoint.rstrip('/')}/chat/completions", api_key, payload) as resp:
+        if "text/event-stream" not in resp.headers.get("Content-Type", ""):
+            # Endpoint ignored stream=true: the whole answer is the first token
+            json.loads(resp.text())
+            ttft = time.monotonic() - started
+        else:
+            for line in resp:
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise RuntimeError(f"completion failed: {chunk['error'].get('message', chunk['error'])}")
+                if ttft is None and chunk.get("choices"):
+                    ttft = time.monotonic() - started
+    total = time.monotonic() - started
+    if ttft is None:
+        raise RuntimeError("completion stream ended without a token")
+    return ttft, total
+
+
+def warm_up(payload):
+    """Check one credential payload (see inferens.credential_payload). Returns its model list."""
+    name = payload["name"]
+    endpoint = payload["data"]["baseUrl"]
+    api_key = payload["data"]["apiKey"]
+    model = payload["data"].get("model", "")
+
+    models = list_models(endpoint, api_key)
+    print(f"WARMUP: '{name}': {endpoint} serves {len(models)} models")
+    if not model:
+        print(f"WARMUP: '{name}': no default model configured, skipping the completion")
+        return models
+    if models and model not in models:
+        raise RuntimeError(f"model '{model}' is not served by {endpoint} (available: {', '.join(models[:10])})")
+
+    ttft, total = first_token(endpoint, api_key, model)
+    metrics.record_phase(f"ttft:{name}", ttft)
+    metrics.record_phase(f"completion:{name}", total)
+    print(f"WARMUP: '{name}': {model} first token after {ttft * 1000:.0f}ms, done after {total * 1000:.0f}ms")
+    return models
+
+
+def _save_models(models_by_name):
+    if not inferens.STATE_DIR:
+        return
+    path = os.path.join(inferens.STATE_DIR, MODELS_CACHE_FILE)
+    try:
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"checkedAt": int(time.time()), "credentials": models_by_name}, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        print(f"WARMUP: Could not write {path}: {e}")
+
+
+def warm_up_all():
+    """Warm up every configured credential; returns False if any of them failed."""
+    models_by_name = {}
+    failed = []
+    for payload in inferens.desired_credentials():
+        try:
+            models = warm_up(payload)
+        except Exception as e:
+            print(f"WARMUP: ERROR - credential '{payload['name']}' does not work: {e}")
+            failed.append(payload["name"])
+            continue
+        models_by_name[payload["name"]] = {"endpoint": payload["data"]["baseUrl"], "models": models}
+    _save_models(models_by_name)
+    return not failed
+
+
+if __name__ == "__main__":
+    ok = metrics.timed("warmup", warm_up_all)
+    metrics.flush()
+    sys.exit(0 if ok else 1)
@@ -85,11 +85,19 @@ Validate required values
 {{- if not .Values.global.domain -}}
 {{- fail "global.domain is required. Please set it in your values.yaml or via --set global.domain=your-domain.com" -}}
 {{- end -}}
-{{- if and .Values.inferens.enabled (or (not .Values.secrets.adminEmail) (not .Values.secrets.adminPassword)) -}}
-{{- fail "inferens.enabled requires secrets.adminEmail and secrets.adminPassword to authenticate and provision credentials in n8n" -}}
+{{- if and .Values.inferens.enabled (or (not .Values.secrets.adminEmail) (not .Values.secrets.adminPassword)) (not .Values.secrets.publicApiKey) -}}
+{{- fail "inferens.enabled requires secrets.adminEmail and secrets.adminPassword, or secrets.publicApiKey, to authenticate and provision credentials in n8n" -}}
+{{- end -}}
+{{- if .Values.inferens.enabled -}}
+{{- $needsApiKey := not .Values.inferens.credentials -}}
+{{- range .Values.inferens.credentials -}}
+{{- if not .apiKey -}}
+{{- $needsApiKey = true -}}
+{{- end -}}
+{{- end -}}
+{{- if and $needsApiKey (not .Values.inferens.apiKey) -}}
+{{- fail "inferens.enabled requires inferens.apiKey unless every inferens.credentials entry sets its own apiKey" -}}
 {{- end -}}
-{{- if and .Values.inferens.enabled (not .Values.inferens.apiKey) -}}
-{{- fail "inferens.enabled requires inferens.apiKey" -}}
 {{- end -}}
 {{- end -}}
 
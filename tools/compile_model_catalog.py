@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compile charts/eneo/catalog/models.yaml into charts/eneo/files/model_catalog.json.
+
+The compiled artifact holds everything the bootstrap scripts need, already
+in its final shape:
+
+  ai_models      document for Eneo's ai_models.yml (generate_models.py)
+  tenant_models  tenant-models API payloads per kind (gdm.py)
+  sha256         hash of the two above, for cheap change detection
+
+Run after editing the catalog; --check exits non-zero if the committed
+artifact is stale (CI runs it before publishing the charts). Requires PyYAML.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import yaml
+
+CHART_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "charts", "eneo")
+SOURCE_PATH = os.path.join(CHART_DIR, "catalog", "models.yaml")
+OUTPUT_PATH = os.path.join(CHART_DIR, "files", "model_catalog.json")
+
+# Field order of the ai_models.yml entries, as Eneo's own file lays them out
+AI_MODEL_FIELDS = {
+    "completion": [
+        "name", "nickname", "family", "token_limit", "max_input_tokens", "max_output_tokens",
+        "stability", "is_deprecated", "hosting", "description", "org", "vision", "reasoning",
+        "litellm_model_name",
+    ],
+    "embedding": [
+        "name", "family", "open_source", "max_input", "max_batch_size", "is_deprecated",
+        "stability", "hosting", "description", "org", "litellm_model_name",
+    ],
+}
+
+TENANT_MODEL_FIELDS = {
+    "completion": [
+        "name", "display_name", "token_limit", "max_input_tokens", "max_output_tokens",
+        "vision", "reasoning", "hosting", "is_active",
+    ],
+    "embedding": ["name", "display_name", "family", "max_input", "hosting", "is_active"],
+    "transcription": ["name", "display_name", "hosting", "is_active"],
+}
+
+KIND_DEFAULTS = {
+    "completion": {"family": "openai"},
+    "embedding": {"open_source": True},
+    "transcription": {},
+}
+
+
+def _expand(entry, kind, defaults):
+    """Fill in defaults and the name-derived fields of one catalog entry."""
+    if "name" not in entry:
+        raise ValueError(f"{kind} model without a name: {entry}")
+    name = entry["name"]
+    return {
+        **defaults,
+        **KIND_DEFAULTS[kind],
+        "nickname": name,
+        "display_name": name,
+        "litellm_model_name": f"gdm/{name}",
+        **entry,
+    }
+
+
+def _pick(model, fields, kind):
+    missing = [field for field in fields if field not in model]
+    if missing:
+        raise ValueError(f"{kind} model '{model['name']}' is missing {', '.join(missing)}")
+    return {field: model[field] for field in fields}
+
+
+def compile_catalog(source):
+    """Return the compiled catalog for a parsed models.yaml."""
+    defaults = source.get("defaults", {})
+    ai_models = {}
+    tenant_models = {}
+    for kind, fields in TENANT_MODEL_FIELDS.items():
+        models = [_expand(entry, kind, defaults) for entry in source.get(kind) or []]
+        names = [m["name"] for m in models]
+        duplicates = sorted({n for n in names if names.count(n) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate {kind} models: {', '.join(duplicates)}")
+        tenant_models[kind] = [_pick(m, fields, kind) for m in models]
+        if kind in AI_MODEL_FIELDS:
+            ai_models[f"{kind}_models"] = [_pick(m, AI_MODEL_FIELDS[kind], kind) for m in models]
+
+    body = {"ai_models": ai_models, "tenant_models": tenant_models}
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+    return {"sha256": digest, **body}
+
+
+def render(catalog):
+    return json.dumps(catalog, indent=2, ensure_ascii=False) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the GDM model catalog.")
+    parser.add_argument("--check", action="store_true",
+                        help="only verify that the committed artifact is up to date")
+    args = parser.parse_args()
+
+    with open(SOURCE_PATH, "r") as f:
+        rendered = render(compile_catalog(yaml.safe_load(f)))
+
+    try:
+        with open(OUTPUT_PATH, "r") as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = None
+
+    if args.check:
+        if current != rendered:
+            print(f"{os.path.relpath(OUTPUT_PATH)} is out of date, run {os.path.relpath(__file__)}")
+            sys.exit(1)
+        print("Model catalog is up to date.")
+        return
+
+    if current == rendered:
+        print("Model catalog unchanged.")
+        return
+    with open(OUTPUT_PATH, "w") as f:
+        f.write(rendered)
+    print(f"Wrote {os.path.relpath(OUTPUT_PATH)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Keep the bootstrap modules shared between the charts in sync.
+
+readiness.py, resilience.py and telemetry.py ship in both charts' files/
+directories, because each chart mounts its scripts from its own ConfigMap.
+The eneo chart holds the copies that are edited; this script copies them
+over the n8n ones. Run it after changing a shared module; --check exits
+non-zero if a copy differs (CI runs it before publishing the charts).
+Only the standard library is used.
+"""
+
+import argparse
+import os
+import sys
+
+CHARTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "charts")
+SOURCE_DIR = os.path.join(CHARTS_DIR, "eneo", "files")
+COPY_DIRS = [os.path.join(CHARTS_DIR, "n8n", "files")]
+SHARED_MODULES = ["readiness.py", "resilience.py", "telemetry.py"]
+
+
+def _read(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def stale_copies():
+    """(source, copy) path pairs whose copy differs from the source."""
+    stale = []
+    for module in SHARED_MODULES:
+        source = os.path.join(SOURCE_DIR, module)
+        content = _read(source)
+        for copy_dir in COPY_DIRS:
+            copy = os.path.join(copy_dir, module)
+            if _read(copy) != content:
+                stale.append((source, copy))
+    return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the shared bootstrap modules between the charts.")
+    parser.add_argument("--check", action="store_true",
+                        help="only verify that every copy matches the eneo chart's module")
+    args = parser.parse_args()
+
+    stale = stale_copies()
+    if args.check:
+        if stale:
+            for source, copy in stale:
+                print(f"{os.path.relpath(copy)} differs from {os.path.relpath(source)}")
+            print(f"Run {os.path.relpath(__file__)} to copy the eneo chart's modules over.")
+            sys.exit(1)
+        print("Shared modules are in sync.")
+        return
+
+    if not stale:
+        print("Shared modules unchanged.")
+        return
+    for source, copy in stale:
+        with open(copy, "wb") as f:
+            f.write(_read(source))
+        print(f"Wrote {os.path.relpath(copy)}")
+
+
+if __name__ == "__main__":
+    main()